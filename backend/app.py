@@ -88,6 +88,11 @@ app.config.from_object(current_config)
 
 app.secret_key = os.getenv("SECRET_KEY", os.urandom(24))  
 
+# The debug reloader's parent process only watches files; the child it spawns serves requests
+app.config["START_MODEL_WARMUP"] = not (
+    __name__ == "__main__" and app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true"
+)
+
 # Initialize extensions
 from models import db
 db.init_app(app)
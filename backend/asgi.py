@@ -0,0 +1,124 @@
+"""ASGI entry point: /search streams from the async pipeline, every other route is served by Flask.
+
+Each open search stream is a coroutine rather than a worker thread, so one process can hold
+thousands of them. Run with e.g.:
+    uvicorn asgi:app --app-dir backend --host 0.0.0.0 --port 5000
+"""
+import asyncio
+import json
+import logging
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+from http_client import close_async_clients, close_sessions
+from cancellation import register_search, unregister_search
+from ollama_scheduler import scheduling
+
+# Try both import styles to handle different run contexts
+try:
+    from routes.index import format_event, start_search
+except ImportError:
+    from backend.routes.index import format_event, start_search
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def _send_json(send, status: int, body: dict):
+    """Send a complete JSON response."""
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json")],
+    })
+    await send({"type": "http.response.body", "body": json.dumps(body).encode()})
+
+
+async def search(scope, receive, send):
+    """Stream search results as server-sent events until the pipeline finishes or the client leaves."""
+    params = parse_qs(scope["query_string"].decode())
+    try:
+        data = json.loads(params.get("data", [""])[0])
+        results = start_search(data, use_async=True)
+    except (ValueError, KeyError, TypeError) as e:
+        await _send_json(send, 400, {"error": f"Invalid search request: {str(e)}"})
+        return
+    if results is None:
+        await _send_json(send, 400, {"error": f"Unsupported category: {data.get('category')}"})
+        return
+
+    response_started = False
+    client_disconnected = False
+
+    async def stream():
+        nonlocal response_started
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")],
+        })
+        response_started = True
+        async for result in results:
+            await send({"type": "http.response.body", "body": format_event(result).encode(), "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def watch_disconnect():
+        nonlocal client_disconnected
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        client_disconnected = True
+
+    # Stop classifying as soon as the client goes away or POSTs /cancel-search;
+    # the stream task's Ollama calls are queued fairly under the client's address
+    client = scope.get("client")
+    with scheduling(tenant=f"ip:{client[0]}" if client else None):
+        stream_task = asyncio.ensure_future(stream())
+    disconnect_task = asyncio.ensure_future(watch_disconnect())
+    search_id = data.get("search_id") or uuid.uuid4().hex
+    cancel_token = register_search(search_id)
+    loop = asyncio.get_running_loop()
+    cancel_token.add_callback(lambda: loop.call_soon_threadsafe(stream_task.cancel))
+    try:
+        await asyncio.wait({stream_task, disconnect_task}, return_when=asyncio.FIRST_COMPLETED)
+        if not stream_task.done():
+            logger.info("Search client disconnected, cancelling pipeline")
+        elif not stream_task.cancelled():
+            stream_task.result()
+    finally:
+        for task in (stream_task, disconnect_task):
+            task.cancel()
+        await asyncio.gather(stream_task, disconnect_task, return_exceptions=True)
+        await results.aclose()
+        unregister_search(search_id, cancel_token)
+
+    # End the event stream cleanly if the search was cancelled while the client is still connected
+    if cancel_token.cancelled and response_started and not client_disconnected:
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def lifespan(scope, receive, send):
+    """Close the pooled sync sessions and async clients on shutdown."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_clients()
+            close_sessions()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """Route async search streams to the coroutine pipeline and the rest to Flask."""
+    if scope["type"] == "lifespan":
+        await lifespan(scope, receive, send)
+    elif scope["type"] == "http" and scope["path"] == "/search":
+        await search(scope, receive, send)
+    else:
+        await wsgi_app(scope, receive, send)
@@ -0,0 +1,270 @@
+"""Benchmarks for the sentiment classification pipeline.
+
+Run against a live Ollama instance, e.g.:
+    python backend/benchmarks.py batch --model gemma3:1b --batch-size 8
+    python backend/benchmarks.py concurrent --model gemma3:1b --searches 8
+    python backend/benchmarks.py explain --model gemma3:1b --count 5
+    python backend/benchmarks.py stream --model deepseek-r1:7b --count 5
+
+The query matcher benchmark needs no Ollama:
+    python backend/benchmarks.py match --query "bitcoin etf price" --count 100
+"""
+import argparse
+import logging
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from sqlalchemy import create_engine
+
+import model_warmup
+import sentiment_analyzer
+from query_matcher import QueryMatcher
+from sentiment_analyzer import BaseSentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+# Loading models in the background would compete with the Ollama calls being timed
+model_warmup.OLLAMA_WARMUP_ENABLED = False
+
+SAMPLE_TITLES = [
+    "Stocks rally as inflation cools faster than expected",
+    "Storm leaves thousands without power across the region",
+    "City council approves new budget for public transport",
+    "Tech giant reports record quarterly profits",
+    "Wildfire forces evacuation of mountain villages",
+    "Scientists announce breakthrough in battery technology",
+    "Unemployment figures remain unchanged for third month",
+    "Local team clinches championship in dramatic final",
+    "Airline cancels hundreds of flights amid staff shortages",
+    "New study finds link between sleep and memory",
+    "Government unveils plan to cut energy bills",
+    "Factory closure puts 500 jobs at risk",
+    "Central bank holds interest rates steady",
+    "Charity marathon raises millions for children's hospital",
+    "Data breach exposes records of millions of customers",
+    "Museum reopens after two-year renovation",
+    "Housing prices fall for the fifth consecutive month",
+    "Volunteers clean up beach after oil spill",
+    "Election results delayed by counting errors",
+    "Startup secures funding to expand electric bus fleet",
+]
+
+
+def _load_titles(path: str, count: int) -> List[str]:
+    """Load titles from a file (one per line) or cycle the built-in samples."""
+    if path:
+        with open(path, encoding="utf-8") as f:
+            titles = [line.strip() for line in f if line.strip()]
+    else:
+        titles = SAMPLE_TITLES
+    selected = []
+    for i in range(count):
+        title = titles[i % len(titles)]
+        # Suffix repeated titles so every one misses the cache
+        selected.append(title if i < len(titles) else f"{title} ({i})")
+    return selected
+
+
+def _create_analyzer() -> BaseSentimentAnalyzer:
+    """Create an analyzer on a throwaway SQLite database with every cache emptied."""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="sentiscope-bench-"), "benchmark.db")
+    analyzer = BaseSentimentAnalyzer(engine=create_engine(f"sqlite:///{db_path}"))
+    analyzer.cache.clear()
+    analyzer.persistent_cache = None
+    return analyzer
+
+
+def _time_classification(titles: List[str], model: str, batch_size: int) -> float:
+    """Classify titles with empty caches and return elapsed seconds."""
+    sentiment_analyzer.OLLAMA_BATCH_SIZE = batch_size
+    analyzer = _create_analyzer()
+    start = time.perf_counter()
+    results = list(analyzer._classify_titles(titles, model))
+    elapsed = time.perf_counter() - start
+    unknown = sum(1 for _, sentiment in results if sentiment not in sentiment_analyzer.VALID_SENTIMENTS)
+    print(f"  batch_size={batch_size:<3} {elapsed:7.2f}s  {len(titles) / elapsed:6.2f} titles/s  ({unknown} unknown)")
+    return elapsed
+
+
+def benchmark_batch(args):
+    """Compare per-title prompts against multi-title batch prompts."""
+    titles = _load_titles(args.titles_file, args.count)
+    print(f"Classifying {len(titles)} titles with {args.model}")
+    single = _time_classification(titles, args.model, 1)
+    batched = _time_classification(titles, args.model, args.batch_size)
+    print(f"  speedup: {single / batched:.2f}x")
+
+
+def benchmark_concurrent(args):
+    """Run parallel searches through one shared analyzer and check every result is labelled and saved."""
+    analyzer = _create_analyzer()
+    titles = _load_titles(args.titles_file, args.count)
+
+    def run_search(search_id: int) -> int:
+        search_titles = [f"{title} [search {search_id}]" for title in titles]
+        labelled = 0
+        for index, sentiment in analyzer._classify_titles(search_titles, args.model):
+            analyzer._save_to_database("benchmark", "benchmark", search_titles[index], sentiment, "benchmark", args.model)
+            labelled += 1
+        return labelled
+
+    print(f"Running {args.searches} parallel searches of {len(titles)} titles with {args.model}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.searches) as executor:
+        labelled = list(executor.map(run_search, range(args.searches)))
+    elapsed = time.perf_counter() - start
+    analyzer.writer.close()
+
+    stats = analyzer.writer.stats()
+    expected = args.searches * len(titles)
+    print(f"  {sum(labelled)}/{expected} results labelled in {elapsed:.2f}s")
+    print(f"  writer: {stats['written']} written, {stats['duplicates']} duplicates, {stats['failed']} failed")
+    if sum(labelled) != expected or stats["failed"]:
+        raise SystemExit("Concurrent searches lost or failed results")
+
+
+def _two_call_explanation(analyzer: BaseSentimentAnalyzer, text: str, model: str):
+    """The previous explanation flow: classify first, then ask for an explanation of that label."""
+    sentiment = analyzer._request_sentiment(text, model)
+    payload = {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": f"You are performing sentiment analysis. The sentiment of the following text has been determined to be '{sentiment}'. "
+                           f"Please explain why you assigned the sentiment to be '{sentiment}' in one concise sentence."
+            },
+            {
+                "role": "user",
+                "content": f"Text: '{text}'\nExplain why this is {sentiment}:"
+            }
+        ],
+        "stream": False,
+    }
+    analyzer._call_ollama(payload, basic=False)
+
+
+def benchmark_explain(args):
+    """Compare the fused structured explanation call against the two-call flow."""
+    titles = _load_titles(args.titles_file, args.count)
+    print(f"Explaining {len(titles)} titles with {args.model}")
+
+    analyzer = _create_analyzer()
+    start = time.perf_counter()
+    for title in titles:
+        _two_call_explanation(analyzer, title, args.model)
+    two_call = (time.perf_counter() - start) / len(titles)
+    print(f"  two calls: {two_call:6.2f}s per explanation")
+
+    analyzer = _create_analyzer()
+    start = time.perf_counter()
+    missing_confidence = 0
+    for title in titles:
+        if analyzer._request_explanation(title, args.model)["confidence"] is None:
+            missing_confidence += 1
+    fused = (time.perf_counter() - start) / len(titles)
+    print(f"  fused:     {fused:6.2f}s per explanation  ({missing_confidence} without a confidence score)")
+    print(f"  speedup: {two_call / fused:.2f}x")
+
+
+def _time_single_labels(titles: List[str], model: str, streaming: bool) -> float:
+    """Classify titles one prompt each, with or without reading the label early, and return seconds per title."""
+    sentiment_analyzer.OLLAMA_STREAM_LABELS = streaming
+    analyzer = _create_analyzer()
+    start = time.perf_counter()
+    labels = [analyzer._request_sentiment(title, model) for title in titles]
+    per_title = (time.perf_counter() - start) / len(titles)
+    unknown = sum(1 for label in labels if label not in sentiment_analyzer.VALID_SENTIMENTS)
+    print(f"  {'early stop' if streaming else 'full reply'}: {per_title:6.2f}s per title  ({unknown} unknown)")
+    return per_title
+
+
+def benchmark_stream(args):
+    """Compare waiting for the full single-label reply against hanging up once the label is read."""
+    titles = _load_titles(args.titles_file, args.count)
+    print(f"Classifying {len(titles)} titles one at a time with {args.model}")
+    full = _time_single_labels(titles, args.model, False)
+    streamed = _time_single_labels(titles, args.model, True)
+    print(f"  speedup: {full / streamed:.2f}x")
+
+
+def _legacy_title_matches(title: str, query: str) -> bool:
+    """The previous matcher: normalize per title and compile two regexes per term per title."""
+    query_terms = re.sub(r'[^\w\s]', '', query.lower()).split()
+    normalized_title = re.sub(r'[^\w\s]', '', title.lower())
+    for term in query_terms:
+        if term and re.search(rf'\b{term}', normalized_title) or re.search(rf'{term}', normalized_title):
+            return True
+    return False
+
+
+def benchmark_match(args):
+    """Compare per-title regex matching against one compiled matcher scanning the whole batch."""
+    titles = _load_titles(args.titles_file, args.count)
+    print(f"Matching '{args.query}' against {len(titles)} titles, {args.repeat} rounds")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        legacy = [_legacy_title_matches(title, args.query) for title in titles]
+    legacy_time = (time.perf_counter() - start) / args.repeat
+    print(f"  per-title regexes: {legacy_time * 1000:8.3f}ms per search")
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        matched = QueryMatcher(args.query).match_titles(titles)
+    matcher_time = (time.perf_counter() - start) / args.repeat
+    print(f"  compiled matcher:  {matcher_time * 1000:8.3f}ms per search")
+    print(f"  speedup: {legacy_time / matcher_time:.2f}x")
+
+    if legacy != [bool(terms) for terms in matched]:
+        raise SystemExit("Matchers disagree on which titles match")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SentiScope classification benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    batch_parser = subparsers.add_parser("batch", help="Per-title vs batch prompt throughput")
+    batch_parser.add_argument("--model", default="gemma3:1b")
+    batch_parser.add_argument("--batch-size", type=int, default=sentiment_analyzer.OLLAMA_BATCH_SIZE)
+    batch_parser.add_argument("--count", type=int, default=len(SAMPLE_TITLES))
+    batch_parser.add_argument("--titles-file", default=None)
+    batch_parser.set_defaults(func=benchmark_batch)
+
+    concurrent_parser = subparsers.add_parser("concurrent", help="Parallel searches through a shared analyzer")
+    concurrent_parser.add_argument("--model", default="gemma3:1b")
+    concurrent_parser.add_argument("--searches", type=int, default=8)
+    concurrent_parser.add_argument("--count", type=int, default=len(SAMPLE_TITLES))
+    concurrent_parser.add_argument("--titles-file", default=None)
+    concurrent_parser.set_defaults(func=benchmark_concurrent)
+
+    explain_parser = subparsers.add_parser("explain", help="Fused vs two-call explanation latency")
+    explain_parser.add_argument("--model", default="gemma3:1b")
+    explain_parser.add_argument("--count", type=int, default=5)
+    explain_parser.add_argument("--titles-file", default=None)
+    explain_parser.set_defaults(func=benchmark_explain)
+
+    stream_parser = subparsers.add_parser("stream", help="Full vs early-stopped single-label replies")
+    stream_parser.add_argument("--model", default="gemma3:1b")
+    stream_parser.add_argument("--count", type=int, default=5)
+    stream_parser.add_argument("--titles-file", default=None)
+    stream_parser.set_defaults(func=benchmark_stream)
+
+    match_parser = subparsers.add_parser("match", help="Per-title regexes vs compiled query matcher")
+    match_parser.add_argument("--query", default="bitcoin price rally")
+    match_parser.add_argument("--count", type=int, default=100)
+    match_parser.add_argument("--repeat", type=int, default=200)
+    match_parser.add_argument("--titles-file", default=None)
+    match_parser.set_defaults(func=benchmark_match)
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
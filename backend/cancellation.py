@@ -0,0 +1,148 @@
+import contextvars
+import logging
+import os
+import queue
+import threading
+from typing import Callable, Dict, Generator, Iterable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds between keep-alive events while a search waits on Ollama; every write
+# gives the server a chance to notice a client that has gone away
+SEARCH_HEARTBEAT_INTERVAL = float(os.getenv("SEARCH_HEARTBEAT_INTERVAL", "5"))
+
+_DONE = object()
+
+
+class SearchCancelled(Exception):
+    """Raised inside the pipeline once its search has been cancelled."""
+
+
+class CancellationToken:
+    """Thread-safe cancel flag whose callbacks abort in-flight work."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Mark the search cancelled and run every registered callback once."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Cancellation callback failed: {str(e)}")
+
+    def add_callback(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Run callback on cancel (immediately if already cancelled); returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        """Raise SearchCancelled if the search has been cancelled."""
+        if self._event.is_set():
+            raise SearchCancelled()
+
+
+# Tokens of the searches currently streaming in this process, keyed by client search id
+_active_searches: Dict[str, CancellationToken] = {}
+_active_searches_lock = threading.Lock()
+
+
+def register_search(search_id: str) -> CancellationToken:
+    """Create the cancellation token for a new search stream."""
+    token = CancellationToken()
+    with _active_searches_lock:
+        previous = _active_searches.get(search_id)
+        _active_searches[search_id] = token
+    # A reused id means the client abandoned the earlier stream
+    if previous is not None:
+        previous.cancel()
+    return token
+
+
+def unregister_search(search_id: str, token: CancellationToken):
+    """Forget a finished search unless its id has since been reused."""
+    with _active_searches_lock:
+        if _active_searches.get(search_id) is token:
+            del _active_searches[search_id]
+
+
+def cancel_search(search_id: str) -> bool:
+    """Cancel a running search, returning False if no such search is streaming here."""
+    with _active_searches_lock:
+        token = _active_searches.get(search_id)
+    if token is None:
+        return False
+    logger.info(f"Cancelling search {search_id}")
+    token.cancel()
+    return True
+
+
+def active_search_count() -> int:
+    """Return the number of searches currently streaming in this process."""
+    with _active_searches_lock:
+        return len(_active_searches)
+
+
+def iter_with_heartbeat(
+    results: Iterable,
+    cancel_token: CancellationToken,
+    interval: float = SEARCH_HEARTBEAT_INTERVAL
+) -> Generator[Optional[Dict], None, None]:
+    """Drain a search pipeline on a worker thread, yielding None whenever interval passes without a result.
+
+    The worker stops at the pipeline's next cancellation check once the token is cancelled.
+    """
+    items = queue.Queue()
+
+    def drain():
+        try:
+            for result in results:
+                items.put(result)
+                if cancel_token.cancelled:
+                    break
+        except Exception as e:
+            logger.error(f"Search pipeline failed: {str(e)}")
+            items.put({"error": f"Search failed: {str(e)}"})
+        finally:
+            if hasattr(results, "close"):
+                results.close()
+            items.put(_DONE)
+
+    # The worker keeps the request's context, e.g. its Ollama scheduling tenant
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(drain,), name="search-pipeline", daemon=True).start()
+    while True:
+        try:
+            item = items.get(timeout=interval)
+        except queue.Empty:
+            yield None
+            continue
+        if item is _DONE:
+            return
+        yield item
@@ -30,6 +30,9 @@ class Config:
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_pre_ping': True,
         'pool_recycle': 300,
+        # Shared by request handlers, analyzer worker threads and the result writer
+        'pool_size': int(os.getenv("DB_POOL_SIZE", "10")),
+        'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", "20")),
     }
 
     # Google OAuth
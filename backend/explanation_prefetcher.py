@@ -0,0 +1,102 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List
+
+from dotenv import load_dotenv
+
+from ollama_scheduler import PRIORITY_BACKGROUND, scheduling
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Speculative explanation configuration
+EXPLANATION_PREFETCH_COUNT = int(os.getenv("EXPLANATION_PREFETCH_COUNT", "3"))  # Top results per search, 0 disables
+EXPLANATION_PREFETCH_MAX_FOREGROUND = int(os.getenv("EXPLANATION_PREFETCH_MAX_FOREGROUND", "0"))
+EXPLANATION_PREFETCH_BACKOFF = float(os.getenv("EXPLANATION_PREFETCH_BACKOFF", "1.0"))
+EXPLANATION_PREFETCH_QUEUE_SIZE = int(os.getenv("EXPLANATION_PREFETCH_QUEUE_SIZE", "100"))
+
+
+class ExplanationPrefetcher:
+    """Low-priority background worker that generates explanations before anyone clicks.
+
+    Jobs only run while the foreground classification queue is at or below max_foreground;
+    otherwise the worker sleeps and checks again, so prefetching never competes with searches.
+    """
+
+    def __init__(self, foreground_depth: Callable[[], int],
+                 max_foreground: int = EXPLANATION_PREFETCH_MAX_FOREGROUND,
+                 backoff: float = EXPLANATION_PREFETCH_BACKOFF):
+        self.foreground_depth = foreground_depth
+        self.max_foreground = max_foreground
+        self.backoff = backoff
+        self._queue = queue.Queue(maxsize=EXPLANATION_PREFETCH_QUEUE_SIZE)
+        self._stopping = threading.Event()
+        self._stats_lock = threading.Lock()
+        self._stats = {"queued": 0, "completed": 0, "failed": 0, "dropped": 0, "backoffs": 0}
+        self._thread = threading.Thread(target=self._run, name="explanation-prefetch", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def submit(self, analyzer, items: List[Dict], model: str):
+        """Queue explanations for (id, title) items without blocking; drops jobs when the queue is full."""
+        for item in items:
+            try:
+                self._queue.put_nowait((analyzer, item["id"], item["title"], model))
+                self._count("queued")
+            except queue.Full:
+                self._count("dropped")
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                analyzer, item_id, title, model = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            # Yield to searches: wait until the foreground classification queue drains
+            while self.foreground_depth() > self.max_foreground and not self._stopping.is_set():
+                self._count("backoffs")
+                time.sleep(self.backoff)
+            if self._stopping.is_set():
+                return
+
+            try:
+                # Queued behind every search and click in the Ollama scheduler
+                with scheduling(priority=PRIORITY_BACKGROUND, tenant="prefetch"):
+                    sentiment, _ = analyzer.get_sentiment_explanation(item_id, title, model)
+                self._count("completed" if sentiment != "error" else "failed")
+            except Exception as e:
+                self._count("failed")
+                logger.error(f"Explanation prefetch failed: {str(e)}")
+
+    def close(self):
+        """Stop the worker; queued speculative jobs are discarded."""
+        self._stopping.set()
+
+    def stats(self) -> Dict:
+        """Return job counters and the number of queued jobs."""
+        with self._stats_lock:
+            return dict(self._stats, queue_depth=self._queue.qsize())
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_explanation_prefetcher(foreground_depth: Callable[[], int]) -> ExplanationPrefetcher:
+    """Return the process-wide prefetcher, creating it on first use."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = ExplanationPrefetcher(foreground_depth)
+        return _prefetcher
@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from typing import AsyncGenerator, AsyncIterator, Dict, Generator, Iterable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from cancellation import CancellationToken
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Seconds a source in a combined search may go without producing a result before it is cut off;
+# the default matches the Ollama read timeout, so only a stalled source is dropped
+FAN_OUT_TIMEOUTS = {
+    "news": float(os.getenv("FAN_OUT_TIMEOUT_NEWS", "300")),
+    "video": float(os.getenv("FAN_OUT_TIMEOUT_VIDEO", "300")),
+}
+SOURCE_LABELS = {"news": "News", "video": "Video"}
+
+_DONE = object()
+
+
+def _tag(source_type: str, result: Dict) -> Dict:
+    """Copy a result (it may be a cached dict) and mark which source it came from."""
+    return dict(result, source_type=source_type)
+
+
+def _timeout_event(source_type: str) -> Dict:
+    label = SOURCE_LABELS.get(source_type, source_type)
+    logger.warning(f"{label} results stalled in combined search")
+    return {"error": f"{label} results stopped arriving and were skipped.", "source_type": source_type}
+
+
+def merge_streams(
+    sources: Dict[str, Tuple[Iterable[Dict], CancellationToken]],
+    timeouts: Optional[Dict[str, float]] = None
+) -> Generator[Dict, None, None]:
+    """Run several search pipelines on their own threads and yield their results as they arrive.
+
+    Each result is tagged with its source_type. A source that produces nothing for its timeout
+    is cancelled through its token and reported with an error event; the others carry on.
+    Every result from a source restarts its timeout.
+    """
+    timeouts = dict(FAN_OUT_TIMEOUTS, **(timeouts or {}))
+    events = queue.Queue()
+
+    def drain(source_type: str, results: Iterable[Dict]):
+        try:
+            for result in results:
+                events.put((source_type, result))
+        except Exception as e:
+            logger.error(f"{source_type} pipeline failed: {str(e)}")
+            events.put((source_type, {"error": f"Search failed: {str(e)}"}))
+        finally:
+            if hasattr(results, "close"):
+                results.close()
+            events.put((source_type, _DONE))
+
+    now = time.monotonic()
+    deadlines = {source_type: now + timeouts.get(source_type, 0) for source_type in sources}
+    running = set(sources)
+    for source_type, (results, _) in sources.items():
+        # Workers keep the request's context, e.g. its Ollama scheduling tenant
+        context = contextvars.copy_context()
+        threading.Thread(
+            target=context.run, args=(drain, source_type, results), name=f"fan-out-{source_type}", daemon=True
+        ).start()
+
+    try:
+        while running:
+            wait = min(deadlines[source_type] for source_type in running) - time.monotonic()
+            try:
+                source_type, item = events.get(timeout=max(0, wait))
+            except queue.Empty:
+                for source_type in [s for s in running if deadlines[s] <= time.monotonic()]:
+                    running.discard(source_type)
+                    sources[source_type][1].cancel()
+                    yield _timeout_event(source_type)
+                continue
+
+            if source_type not in running:
+                continue  # Late result from a source that already timed out
+            if item is _DONE:
+                running.discard(source_type)
+            else:
+                deadlines[source_type] = time.monotonic() + timeouts.get(source_type, 0)
+                yield _tag(source_type, item)
+    finally:
+        # Stop whatever is still running when the stream is closed early
+        for source_type in running:
+            sources[source_type][1].cancel()
+
+
+async def merge_streams_async(
+    sources: Dict[str, AsyncIterator[Dict]],
+    timeouts: Optional[Dict[str, float]] = None
+) -> AsyncGenerator[Dict, None]:
+    """Async counterpart of merge_streams; a stalled source's task is cancelled."""
+    timeouts = dict(FAN_OUT_TIMEOUTS, **(timeouts or {}))
+    events = asyncio.Queue()
+
+    async def drain(source_type: str, results: AsyncIterator[Dict]):
+        try:
+            async for result in results:
+                await events.put((source_type, result))
+        except Exception as e:
+            logger.error(f"{source_type} pipeline failed: {str(e)}")
+            await events.put((source_type, {"error": f"Search failed: {str(e)}"}))
+        finally:
+            await results.aclose()
+            events.put_nowait((source_type, _DONE))
+
+    loop = asyncio.get_running_loop()
+    deadlines = {source_type: loop.time() + timeouts.get(source_type, 0) for source_type in sources}
+    tasks = {source_type: asyncio.ensure_future(drain(source_type, results)) for source_type, results in sources.items()}
+    running = set(sources)
+
+    try:
+        while running:
+            wait = min(deadlines[source_type] for source_type in running) - loop.time()
+            try:
+                source_type, item = await asyncio.wait_for(events.get(), timeout=max(0, wait))
+            except asyncio.TimeoutError:
+                for source_type in [s for s in running if deadlines[s] <= loop.time()]:
+                    running.discard(source_type)
+                    tasks[source_type].cancel()
+                    yield _timeout_event(source_type)
+                continue
+
+            if source_type not in running:
+                continue
+            if item is _DONE:
+                running.discard(source_type)
+            else:
+                deadlines[source_type] = loop.time() + timeouts.get(source_type, 0)
+                yield _tag(source_type, item)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
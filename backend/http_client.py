@@ -0,0 +1,165 @@
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from typing import Dict, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+
+# httpx is only needed by the async search pipeline
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Connection settings shared by every upstream
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# Per-upstream pool size, read timeout, retry count and the methods whose error responses are retried.
+# Only Ollama calls are safe to resend; Google's token exchange POST spends a single-use code.
+UPSTREAMS = {
+    "ollama": {
+        "pool_size": int(os.getenv("OLLAMA_POOL_SIZE", "16")),
+        "read_timeout": float(os.getenv("OLLAMA_READ_TIMEOUT", "300")),
+        "retries": int(os.getenv("OLLAMA_RETRIES", "2")),
+        "retry_methods": frozenset(["GET", "POST"]),
+    },
+    "newsapi": {
+        "pool_size": int(os.getenv("NEWSAPI_POOL_SIZE", "4")),
+        "read_timeout": float(os.getenv("NEWSAPI_READ_TIMEOUT", "10")),
+        "retries": int(os.getenv("NEWSAPI_RETRIES", "2")),
+        "retry_methods": frozenset(["GET"]),
+    },
+    "youtube": {
+        "pool_size": int(os.getenv("YOUTUBE_POOL_SIZE", "4")),
+        "read_timeout": float(os.getenv("YOUTUBE_READ_TIMEOUT", "15")),
+        "retries": int(os.getenv("YOUTUBE_RETRIES", "2")),
+        "retry_methods": frozenset(["GET"]),
+    },
+    "google": {
+        "pool_size": int(os.getenv("GOOGLE_POOL_SIZE", "4")),
+        "read_timeout": float(os.getenv("GOOGLE_READ_TIMEOUT", "10")),
+        "retries": int(os.getenv("GOOGLE_RETRIES", "2")),
+        "retry_methods": frozenset(["GET"]),
+    },
+}
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# Async clients are bound to the event loop that serves the async pipeline
+_async_clients: Dict[str, "httpx.AsyncClient"] = {}
+
+
+def _create_session(upstream: str) -> requests.Session:
+    """Build a keep-alive session with a bounded pool and retry-with-backoff."""
+    config = UPSTREAMS[upstream]
+    retry = Retry(
+        total=config["retries"],
+        connect=config["retries"],
+        read=0,  # Never replay a request whose response was cut off mid-generation
+        status=config["retries"],
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=config["retry_methods"],
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Hand the final error response back to the caller
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config["pool_size"],
+        max_retries=retry,
+        pool_block=False,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    logger.info(f"Created HTTP session for {upstream} (pool size {config['pool_size']})")
+    return session
+
+
+def get_session(upstream: str) -> requests.Session:
+    """Return the shared pooled session for an upstream, creating it on first use."""
+    if upstream not in UPSTREAMS:
+        raise ValueError(f"Unknown upstream: {upstream}")
+
+    with _sessions_lock:
+        if upstream not in _sessions:
+            _sessions[upstream] = _create_session(upstream)
+        return _sessions[upstream]
+
+
+def get_timeout(upstream: str) -> Tuple[float, float]:
+    """Return the (connect, read) timeout pair for an upstream."""
+    return HTTP_CONNECT_TIMEOUT, UPSTREAMS[upstream]["read_timeout"]
+
+
+def close_sessions():
+    """Close every pooled session, e.g. on shutdown."""
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
+
+
+atexit.register(close_sessions)
+
+
+def get_async_client(upstream: str) -> "httpx.AsyncClient":
+    """Return the shared async client for an upstream, creating it on first use."""
+    if httpx is None:
+        raise RuntimeError("httpx is required for the async search pipeline")
+    if upstream not in UPSTREAMS:
+        raise ValueError(f"Unknown upstream: {upstream}")
+
+    client = _async_clients.get(upstream)
+    if client is None or client.is_closed:
+        config = UPSTREAMS[upstream]
+        client = httpx.AsyncClient(
+            # Wait for a free connection instead of failing when the pool is busy
+            timeout=httpx.Timeout(config["read_timeout"], connect=HTTP_CONNECT_TIMEOUT, pool=None),
+            limits=httpx.Limits(max_connections=config["pool_size"], max_keepalive_connections=config["pool_size"]),
+            transport=httpx.AsyncHTTPTransport(retries=config["retries"]),  # Connection errors only
+        )
+        _async_clients[upstream] = client
+        logger.info(f"Created async HTTP client for {upstream} (pool size {config['pool_size']})")
+    return client
+
+
+def _retry_delay(response, attempt: int) -> float:
+    """Return the Retry-After delay if the upstream sent one, else exponential backoff."""
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return HTTP_RETRY_BACKOFF * (2 ** attempt)
+
+
+async def async_request(upstream: str, method: str, url: str, **kwargs):
+    """Send a request with the async client, retrying retryable statuses with backoff."""
+    client = get_async_client(upstream)
+    config = UPSTREAMS[upstream]
+    retries = config["retries"] if method.upper() in config["retry_methods"] else 0
+    for attempt in range(retries + 1):
+        response = await client.request(method, url, **kwargs)
+        if response.status_code not in RETRY_STATUS_CODES or attempt == retries:
+            return response
+        await asyncio.sleep(_retry_delay(response, attempt))
+
+
+async def close_async_clients():
+    """Close every async client, e.g. on ASGI shutdown."""
+    for client in _async_clients.values():
+        await client.aclose()
+    _async_clients.clear()
@@ -0,0 +1,44 @@
+"""Add persistent sentiment_cache table
+
+Revision ID: b7d3e1a9c2f4
+Revises: cdef4f3bbcf8
+Create Date: 2026-10-18 09:12:31.418205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e1a9c2f4'
+down_revision = 'cdef4f3bbcf8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sentiment_cache',
+    sa.Column('title_key', sa.String(length=512), nullable=False),
+    sa.Column('model', sa.String(length=255), nullable=False),
+    sa.Column('prompt_version', sa.String(length=50), nullable=False),
+    sa.Column('sentiment', sa.String(length=50), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('title_key', 'model', 'prompt_version')
+    )
+
+    # Seed the cache with labels already stored in sentiment_results
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("""
+            INSERT INTO sentiment_cache (title_key, model, prompt_version, sentiment, created_at)
+            SELECT DISTINCT ON (title_key, model)
+                   left(lower(btrim(regexp_replace(title, '\\s+', ' ', 'g'))), 512) AS title_key,
+                   model, 'v1', sentiment, now()
+            FROM sentiment_results
+            WHERE title IS NOT NULL AND model IS NOT NULL
+              AND sentiment IN ('positive', 'negative', 'neutral')
+            ON CONFLICT DO NOTHING
+        """)
+
+
+def downgrade():
+    op.drop_table('sentiment_cache')
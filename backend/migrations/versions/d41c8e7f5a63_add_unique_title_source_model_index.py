@@ -0,0 +1,34 @@
+"""Add unique (title, source, model) constraint to sentiment_results
+
+Revision ID: d41c8e7f5a63
+Revises: b7d3e1a9c2f4
+Create Date: 2026-10-18 10:47:05.129334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41c8e7f5a63'
+down_revision = 'b7d3e1a9c2f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Remove duplicates that slipped past the old in-memory check, keeping the oldest row
+    op.execute("""
+        DELETE FROM sentiment_results
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM sentiment_results GROUP BY title, source, model
+        )
+    """)
+
+    with op.batch_alter_table('sentiment_results', schema=None) as batch_op:
+        batch_op.create_unique_constraint('unique_title_source_model', ['title', 'source', 'model'])
+
+
+def downgrade():
+    with op.batch_alter_table('sentiment_results', schema=None) as batch_op:
+        batch_op.drop_constraint('unique_title_source_model', type_='unique')
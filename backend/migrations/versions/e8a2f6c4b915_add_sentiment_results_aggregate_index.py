@@ -0,0 +1,26 @@
+"""Add composite index for sentiment statistics aggregation
+
+Revision ID: e8a2f6c4b915
+Revises: d41c8e7f5a63
+Create Date: 2026-10-18 12:03:44.870512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a2f6c4b915'
+down_revision = 'd41c8e7f5a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('sentiment_results', schema=None) as batch_op:
+        batch_op.create_index('ix_sentiment_results_query_source_model_sentiment', ['query', 'source', 'model', 'sentiment'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('sentiment_results', schema=None) as batch_op:
+        batch_op.drop_index('ix_sentiment_results_query_source_model_sentiment')
@@ -0,0 +1,26 @@
+"""Add (model_used, feedback_type) index to feedback
+
+Revision ID: f3b9d0a7e2c1
+Revises: e8a2f6c4b915
+Create Date: 2026-10-18 13:25:10.556217
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9d0a7e2c1'
+down_revision = 'e8a2f6c4b915'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.create_index('ix_feedback_model_used_feedback_type', ['model_used', 'feedback_type'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('feedback', schema=None) as batch_op:
+        batch_op.drop_index('ix_feedback_model_used_feedback_type')
@@ -0,0 +1,131 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from http_client import get_session, get_timeout
+from ollama_scheduler import PRIORITY_BACKGROUND, OllamaScheduler, scheduling
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How long Ollama keeps a model in memory after each request (Ollama duration string or seconds)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Models loaded at startup: the smallest of each family in the UI's model list, the UI default first.
+# The larger options are left to load on demand.
+OLLAMA_WARMUP_MODELS = os.getenv("OLLAMA_WARMUP_MODELS", "gemma3:1b,qwen2.5:1.5b,deepseek-r1:7b")
+OLLAMA_WARMUP_ENABLED = os.getenv("OLLAMA_WARMUP_ENABLED", "true").lower() == "true"
+OLLAMA_WARMUP_INTERVAL = float(os.getenv("OLLAMA_WARMUP_INTERVAL", "300"))  # Seconds between load checks, 0 warms once
+
+
+class ModelWarmer:
+    """Background worker that loads models before users ask for them.
+
+    Ollama is left to evict models as it needs memory; only when it has nothing loaded at
+    all is the first (default) model loaded again. Each model's state is one of "cold",
+    "loading", "loaded" or "failed".
+    """
+
+    def __init__(self, api_url: str, scheduler: OllamaScheduler, models: List[str],
+                 interval: float = OLLAMA_WARMUP_INTERVAL):
+        self.api_url = api_url
+        self.ps_url = api_url.rsplit("/api/", 1)[0] + "/api/ps"
+        self.scheduler = scheduler
+        self.models = models
+        self.interval = interval
+        self.http = get_session("ollama")
+        self.timeout = get_timeout("ollama")
+        self._states = {model: {"state": "cold", "load_ms": None, "loaded_at": None, "loads": 0, "error": None}
+                        for model in models}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="model-warmup", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _update(self, model: str, **fields):
+        with self._lock:
+            self._states[model].update(fields)
+
+    def _loaded_models(self) -> Optional[set]:
+        """Return the names of the models Ollama currently holds in memory, or None if it cannot be asked."""
+        try:
+            response = self.http.get(self.ps_url, timeout=self.timeout)
+            response.raise_for_status()
+            return {entry.get("name") for entry in response.json().get("models", [])}
+        except Exception as e:
+            logger.warning(f"Could not list loaded Ollama models: {str(e)}")
+            return None
+
+    def warm(self, model: str) -> bool:
+        """Load a model into memory with an empty chat request, recording how long it took."""
+        self._update(model, state="loading", error=None)
+        start = time.perf_counter()
+        try:
+            # Queued behind searches so warming never delays a user's request
+            with scheduling(priority=PRIORITY_BACKGROUND, tenant="warmup"), self.scheduler.slot(model):
+                response = self.http.post(
+                    self.api_url,
+                    json={"model": model, "messages": [], "keep_alive": OLLAMA_KEEP_ALIVE},
+                    timeout=self.timeout
+                )
+            response.raise_for_status()
+        except Exception as e:
+            logger.error(f"Failed to warm up model {model}: {str(e)}")
+            self._update(model, state="failed", error=str(e))
+            return False
+
+        load_ms = round((time.perf_counter() - start) * 1000, 1)
+        with self._lock:
+            state = self._states[model]
+            state.update(state="loaded", load_ms=load_ms, loaded_at=time.time(), loads=state["loads"] + 1)
+        logger.info(f"Model {model} loaded in {load_ms}ms")
+        return True
+
+    def _run(self):
+        for model in self.models:
+            if self._stopping.is_set():
+                return
+            self.warm(model)
+
+        while self.interval > 0 and not self._stopping.wait(self.interval):
+            loaded = self._loaded_models()
+            if loaded is None:
+                continue
+            for model in self.models:
+                self._update(model, state="loaded" if model in loaded else "cold")
+            if not loaded and self.models and not self._stopping.is_set():
+                logger.info(f"Ollama has no models loaded, warming up {self.models[0]} again")
+                self.warm(self.models[0])
+
+    def close(self):
+        """Stop the worker."""
+        self._stopping.set()
+
+    def stats(self) -> Dict:
+        """Return the load state of every warmed model."""
+        with self._lock:
+            return {model: dict(state) for model, state in self._states.items()}
+
+
+_warmer = None
+_warmer_lock = threading.Lock()
+
+
+def get_model_warmer(api_url: str, scheduler: OllamaScheduler) -> Optional[ModelWarmer]:
+    """Return the process-wide warmer, starting it on first use, or None when warm-up is disabled."""
+    global _warmer
+    if not OLLAMA_WARMUP_ENABLED:
+        return None
+    with _warmer_lock:
+        if _warmer is None:
+            models = [model.strip() for model in OLLAMA_WARMUP_MODELS.split(",") if model.strip()]
+            _warmer = ModelWarmer(api_url, scheduler, models)
+        return _warmer
@@ -16,6 +16,11 @@ class SentimentResults(db.Model):
     source = db.Column(db.String(255))
     model = db.Column(db.String(255))
 
+    __table_args__ = (
+        db.UniqueConstraint('title', 'source', 'model', name='unique_title_source_model'),
+        db.Index('ix_sentiment_results_query_source_model_sentiment', 'query', 'source', 'model', 'sentiment'),
+    )
+
     def __repr__(self):
         return f"<SentimentResult {self.title[:20]}...>"
     
@@ -30,6 +35,18 @@ class SentimentResults(db.Model):
             'model': self.model
         }
 
+class SentimentCache(db.Model):
+    __tablename__ = 'sentiment_cache'
+
+    title_key = db.Column(db.String(512), primary_key=True)
+    model = db.Column(db.String(255), primary_key=True)
+    prompt_version = db.Column(db.String(50), primary_key=True)
+    sentiment = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SentimentCache {self.model} {self.title_key[:20]}...>"
+
 class Feedback(db.Model):
     __tablename__ = 'feedback'
     
@@ -46,6 +63,7 @@ class Feedback(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'item_title', 'model_used', name='unique_user_item_model_feedback'),
+        db.Index('ix_feedback_model_used_feedback_type', 'model_used', 'feedback_type'),
     )
     
     # Relationship to User
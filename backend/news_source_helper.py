@@ -1,37 +1,37 @@
-import requests
+import asyncio
 import json
-from typing import Dict, Generator, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple
 import logging
 import os
+import time
 from dotenv import load_dotenv
 from sentiment_analyzer import BaseSentimentAnalyzer
+from http_client import async_request, get_session, get_timeout
+from cancellation import CancellationToken
+from query_matcher import QueryMatcher
+from upstream_cache import upstream_cache
 
 load_dotenv()
 
 # API Configuration
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
 NEWS_API_URL = "https://newsapi.org/v2/everything"
+NEWS_API_PAGE_SIZE = 100  # NewsAPI maximum; always fetch full pages to handle filtering
+
+# Further pages are fetched while earlier matches are classified, until num_articles is met
+NEWSAPI_MAX_PAGES = int(os.getenv("NEWSAPI_MAX_PAGES", "5"))
+NEWSAPI_PAGE_INTERVAL = float(os.getenv("NEWSAPI_PAGE_INTERVAL", "0.5"))  # Seconds between page requests
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class NewsSentimentAnalyzer(BaseSentimentAnalyzer):
-    def __init__(self):
-        super().__init__()
-        
-    def _get_from_cache(self, article_id: int, model: str):
-        """Get cached result if valid and matches current model"""
-        if article_id in self.cache:
-            cached = self.cache[article_id]
-            if isinstance(cached, dict) and cached.get('model') == model:
-                return cached
-        return None
+    result_namespace = "news"
 
-    def _add_to_cache(self, article_id: int, result: Dict, model: str):
-        """Add result to cache with model info"""
-        result['model'] = model
-        self.cache[article_id] = result
+    def __init__(self, engine=None):
+        super().__init__(engine)
 
     def get_news_results(
         self,
@@ -41,125 +41,292 @@ class NewsSentimentAnalyzer(BaseSentimentAnalyzer):
         sort_by: str,
         country: Optional[str],
         category: str = "online news",
-        model: str = "gemma3:1b"
+        model: str = "gemma3:1b",
+        cancel_token: Optional[CancellationToken] = None
     ) -> Generator[Dict, None, None]:
-        """Fetch news articles from NewsAPI ensuring query is in the title."""
+        """Fetch news articles from NewsAPI ensuring query is in the title.
+
+        When the title filter leaves fewer than num_articles, further pages are requested
+        in the background while the matches found so far are classified.
+        """
+        params = self._news_params(query, source, sort_by)
+        pages = ThreadPoolExecutor(max_workers=1, thread_name_prefix="newsapi-pages")
+        try:
+            logger.info(f"Sending request to NewsAPI: {json.dumps({k: v for k, v in params.items() if k != 'apiKey'})}")
+            response = upstream_cache.fetch(
+                "newsapi", NEWS_API_URL, params,
+                lambda: get_session("newsapi").get(NEWS_API_URL, params=params, timeout=get_timeout("newsapi"))
+            )
+
+            error_msg = self._news_response_error(response)
+            if error_msg:
+                yield {"error": error_msg}
+                return
+
+            data = response.json()
+            total_results = data.get("totalResults", 0)
+            articles = data.get("articles", [])
+            seen_urls = set()
+            cached_results = []
+            completed = []
+            page = 1
+            while True:
+                page_cached, pending_results = self._select_articles(
+                    self._unseen_articles(articles, seen_urls), query,
+                    num_articles - len(cached_results) - len(completed), category, model
+                )
+                included = len(cached_results) + len(completed) + len(page_cached) + len(pending_results)
+                next_page = None
+                if self._needs_next_page(page, total_results, included, num_articles):
+                    next_page = pages.submit(self._fetch_news_page, params, page + 1)
+
+                cached_results.extend(page_cached)
+                yield from page_cached
+
+                # Classify this page's queued titles at once and stream each result as it completes
+                titles = [result["title"] for result in pending_results]
+                for index, sentiment in self._classify_titles(titles, model, cancel_token):
+                    completed.append(self._complete_result(pending_results[index], sentiment, query, category, model))
+                    yield completed[-1]
+
+                if next_page is None or (cancel_token is not None and cancel_token.cancelled):
+                    break
+                articles = next_page.result()
+                if articles is None:
+                    break
+                page += 1
+
+            # Speculatively explain the first results shown, once classification is done
+            if cancel_token is None or not cancel_token.cancelled:
+                self._prefetch_explanations(cached_results + completed, model)
+
+            if not cached_results and not completed:
+                yield {"error": f"No articles found with your query '{query}'. Please try different keywords."}
+
+        except Exception as e:
+            error_msg = f"NewsAPI error: {str(e)}"
+            logger.error(error_msg)
+            yield {"error": error_msg}
+        finally:
+            pages.shutdown(wait=False, cancel_futures=True)
+
+    async def get_news_results_async(
+        self,
+        query: str,
+        source: Optional[str],
+        num_articles: int,
+        sort_by: str,
+        country: Optional[str],
+        category: str = "online news",
+        model: str = "gemma3:1b"
+    ) -> AsyncGenerator[Dict, None]:
+        """Async counterpart of get_news_results for the ASGI search endpoint."""
+        params = self._news_params(query, source, sort_by)
+        next_page = None
+        try:
+            logger.info(f"Sending async request to NewsAPI: {json.dumps({k: v for k, v in params.items() if k != 'apiKey'})}")
+            response = await upstream_cache.fetch_async(
+                "newsapi", NEWS_API_URL, params,
+                lambda: async_request("newsapi", "GET", NEWS_API_URL, params=params)
+            )
+
+            error_msg = self._news_response_error(response)
+            if error_msg:
+                yield {"error": error_msg}
+                return
+
+            data = response.json()
+            total_results = data.get("totalResults", 0)
+            articles = data.get("articles", [])
+            seen_urls = set()
+            cached_results = []
+            completed = []
+            page = 1
+            while True:
+                page_cached, pending_results = self._select_articles(
+                    self._unseen_articles(articles, seen_urls), query,
+                    num_articles - len(cached_results) - len(completed), category, model
+                )
+                included = len(cached_results) + len(completed) + len(page_cached) + len(pending_results)
+                next_page = None
+                if self._needs_next_page(page, total_results, included, num_articles):
+                    next_page = asyncio.ensure_future(self._fetch_news_page_async(params, page + 1))
+
+                cached_results.extend(page_cached)
+                for result in page_cached:
+                    yield result
+
+                titles = [result["title"] for result in pending_results]
+                async for index, sentiment in self._classify_titles_async(titles, model):
+                    completed.append(self._complete_result(pending_results[index], sentiment, query, category, model))
+                    yield completed[-1]
+
+                if next_page is None:
+                    break
+                articles = await next_page
+                if articles is None:
+                    break
+                page += 1
+            self._prefetch_explanations(cached_results + completed, model)
+
+            if not cached_results and not completed:
+                yield {"error": f"No articles found with your query '{query}'. Please try different keywords."}
+
+        except Exception as e:
+            error_msg = f"NewsAPI error: {str(e)}"
+            logger.error(error_msg)
+            yield {"error": error_msg}
+        finally:
+            if next_page is not None:
+                next_page.cancel()
+
+    def _news_params(self, query: str, source: Optional[str], sort_by: str) -> Dict:
+        """Build NewsAPI request parameters, leaving out unset ones."""
         params = {
             "q": query,
             "sources": source,
-            "pageSize": 100,  # Always fetch maximum results to handle filtering
+            "pageSize": NEWS_API_PAGE_SIZE,
             "sortBy": sort_by,
             "apiKey": NEWS_API_KEY,
             "language": "en",
         }
+        return {key: value for key, value in params.items() if value is not None}
+
+    def _needs_next_page(self, page: int, total_results: int, included: int, num_articles: int) -> bool:
+        """Whether another page is worth fetching: the quota is unmet and NewsAPI has more results."""
+        return (included < num_articles and page < NEWSAPI_MAX_PAGES
+                and page * NEWS_API_PAGE_SIZE < total_results)
+
+    def _unseen_articles(self, articles: List[Dict], seen_urls: set) -> List[Dict]:
+        """Drop articles already returned on an earlier page, e.g. when new stories shift the pages."""
+        unseen = []
+        for article in articles:
+            if article.get("url") not in seen_urls:
+                seen_urls.add(article.get("url"))
+                unseen.append(article)
+        return unseen
+
+    def _page_articles(self, response, page: int) -> Optional[List[Dict]]:
+        """Return a further page's articles, or None to stop paging (errors, rate limits, plan limits)."""
+        error_msg = self._news_response_error(response)
+        if error_msg:
+            logger.warning(f"Stopped paging NewsAPI at page {page}: {error_msg}")
+            return None
+        return response.json().get("articles") or None
+
+    def _fetch_news_page(self, params: Dict, page: int) -> Optional[List[Dict]]:
+        """Fetch a further page of results on the pooled session, spacing requests to respect rate limits."""
+        page_params = dict(params, page=page)
+
+        def send():
+            time.sleep(NEWSAPI_PAGE_INTERVAL)
+            logger.info(f"Fetching NewsAPI page {page}")
+            return get_session("newsapi").get(NEWS_API_URL, params=page_params, timeout=get_timeout("newsapi"))
+
         try:
-            logger.info(f"Sending request to NewsAPI: {json.dumps({k: v for k, v in params.items() if k != 'apiKey'})}")
-            response = requests.get(NEWS_API_URL, params=params, timeout=10)
-            
-            if response.status_code == 429:
-                error_msg = "API quota exceeded: NewsAPI request limit reached (429)."
-                logger.warning(f"Rate limit hit: {response.text}")
-                yield {"error": error_msg}
-                return
+            response = upstream_cache.fetch("newsapi", NEWS_API_URL, page_params, send)
+            return self._page_articles(response, page)
+        except Exception as e:
+            logger.error(f"NewsAPI page {page} failed: {str(e)}")
+            return None
 
-            elif response.status_code == 200:
-                articles = response.json().get("articles", [])
-                
-                # Initialize counters for logging
-                total_results = len(articles)
-                filtered_count = 0
-                included_count = 0
-                duplicate_count = 0
-                
-                # Process query terms for improved title matching
-                query_terms = self._prepare_query_terms(query)
-                
-                logger.info(f"NewsAPI returned {total_results} total results for query: '{query}'")
-                logger.info("Filtering to only include articles with query in title")
-                
-                for article in articles:
-                    if included_count >= num_articles:
-                        break
-
-                    article_id = hash(article["url"])
-                    title = article.get("title", "")
-                    description = article.get("description", "")
-                    source_name = article.get("source", {}).get("name", "Unknown")
-                    published_at = article.get("publishedAt", "")
-
-                    title_normalized = self._normalize_text(title)
-
-                    if not self._title_matches_query(title_normalized, query_terms):
-                        filtered_count += 1
-                        logger.debug(f"Filtered out: '{title}' from {source_name} (query not in title)")
-                        continue
-
-                    included_count += 1
-                    logger.info(f"Including article {included_count}: '{title}' from {source_name}")
-
-                    # Check if in cache first
-                    if article_id in self.cache:
-                        result = self._get_from_cache(article_id, model)
-                        if result:
-                            is_duplicate = self._is_duplicate_entry(title, source_name, model)
-                            if is_duplicate:
-                                duplicate_count += 1
-                                logger.debug(f"Found duplicate (from cache): '{title}' from {source_name}")
-                            else:
-                                self._save_to_database(query, category, title, 
-                                                       result["sentiment"], source_name, model)
-                                self._add_to_existing_entries(title, source_name, model)
-                                
-                            yield result
-                            continue
-
-                    # Not in cache, analyze sentiment
-                    try:
-                        sentiment = self._analyze_sentiment(title, model)
-                    except Exception as e:
-                        logger.error(f"Sentiment analysis error: {e}")
-                        sentiment = 'unknown'
-
-                    result = {
-                        "id": article_id,
-                        "title": title,
-                        "description": description,
-                        "url": article["url"],
-                        "source": source_name,
-                        "publishedAt": published_at,
-                        "sentiment": sentiment,
-                        "explanation": None
-                    }
-
-                    self._add_to_cache(article_id, result, model)
-                    
-                    # Check for duplicate entry (same title + source combination)
-                    is_duplicate = self._is_duplicate_entry(title, source_name, model)
-                    if is_duplicate:
-                        duplicate_count += 1
-                        logger.debug(f"Found duplicate: '{title}' from {source_name} (not saving to database)")
-                    else:
-                        # Save to database
-                        self._save_to_database(query, category, title, sentiment, source_name, model)
-                        self._add_to_existing_entries(title, source_name, model)
-                    
-                    yield result
+    async def _fetch_news_page_async(self, params: Dict, page: int) -> Optional[List[Dict]]:
+        """Async counterpart of _fetch_news_page."""
+        page_params = dict(params, page=page)
 
-                # Final summary log
-                logger.info(f"Summary: Requested {num_articles} articles, API returned {total_results}, filtered out {filtered_count}, included {included_count}, skipped saving {duplicate_count} duplicates to database")
-                
-                if included_count == 0:
-                    yield {"error": f"No articles found with your query '{query}'. Please try different keywords."}
-                
-            else:
-                error_msg = f"NewsAPI request failed: {response.status_code} - {response.text}"
-                logger.error(error_msg)
-                yield {"error": error_msg}
-                
+        async def send():
+            await asyncio.sleep(NEWSAPI_PAGE_INTERVAL)
+            logger.info(f"Fetching NewsAPI page {page}")
+            return await async_request("newsapi", "GET", NEWS_API_URL, params=page_params)
+
+        try:
+            response = await upstream_cache.fetch_async("newsapi", NEWS_API_URL, page_params, send)
+            return self._page_articles(response, page)
         except Exception as e:
-            error_msg = f"NewsAPI error: {str(e)}"
+            logger.error(f"NewsAPI page {page} failed: {str(e)}")
+            return None
+
+    def _news_response_error(self, response) -> Optional[str]:
+        """Return an error message for a failed NewsAPI response, or None if it succeeded."""
+        if response.status_code == 429:
+            logger.warning(f"Rate limit hit: {response.text}")
+            return "API quota exceeded: NewsAPI request limit reached (429)."
+        if response.status_code != 200:
+            error_msg = f"NewsAPI request failed: {response.status_code} - {response.text}"
             logger.error(error_msg)
-            yield {"error": error_msg}
+            return error_msg
+        return None
+
+    def _select_articles(
+        self,
+        articles: List[Dict],
+        query: str,
+        num_articles: int,
+        category: str,
+        model: str
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Keep articles with the query in their title, split into cached results and results to classify."""
+        total_results = len(articles)
+        filtered_count = 0
+        cached_results = []
+        pending_results = []
+
+        # Match every title against the query in one pass
+        title_matches = QueryMatcher(query).match_titles([article.get("title") or "" for article in articles])
+
+        logger.info(f"NewsAPI returned {total_results} total results for query: '{query}'")
+        logger.info("Filtering to only include articles with query in title")
+
+        for article, matched_terms in zip(articles, title_matches):
+            if len(cached_results) + len(pending_results) >= num_articles:
+                break
+
+            article_id = hash(article["url"])
+            title = article.get("title", "")
+            description = article.get("description", "")
+            source_name = article.get("source", {}).get("name", "Unknown")
+            published_at = article.get("publishedAt", "")
+
+            if not matched_terms:
+                filtered_count += 1
+                logger.debug(f"Filtered out: '{title}' from {source_name} (query not in title)")
+                continue
+
+            logger.info(f"Including article {len(cached_results) + len(pending_results) + 1}: '{title}' from {source_name} "
+                        f"(matched {', '.join(sorted(matched_terms))})")
+
+            # Check if in cache first
+            result = self._get_cached_result(article_id, model)
+            if result:
+                self._save_to_database(query, category, title,
+                                       result["sentiment"], source_name, model)
+                cached_results.append(result)
+                continue
+
+            # Not in cache, queue for concurrent sentiment analysis
+            pending_results.append({
+                "id": article_id,
+                "title": title,
+                "description": description,
+                "url": article["url"],
+                "source": source_name,
+                "publishedAt": published_at,
+                "sentiment": None,
+                "explanation": None
+            })
+
+        included_count = len(cached_results) + len(pending_results)
+        logger.info(f"Summary: Requested {num_articles} articles, API returned {total_results}, filtered out {filtered_count}, included {included_count}")
+        return cached_results, pending_results
+
+    def _complete_result(self, result: Dict, sentiment: str, query: str, category: str, model: str) -> Dict:
+        """Attach a fresh label to a queued article, then cache and save it."""
+        result["sentiment"] = sentiment
+        self._add_to_cache(result["id"], result, model)
+
+        # Queue for saving; the unique index skips existing title+source+model rows
+        self._save_to_database(query, category, result["title"], sentiment, result["source"], model)
+        return result
 
     def get_sentiment_explanation(
         self,
@@ -170,21 +337,18 @@ class NewsSentimentAnalyzer(BaseSentimentAnalyzer):
         """Get detailed sentiment explanation."""
         try:
             # Check cache first
-            if article_id in self.cache and self.cache[article_id]["explanation"]:
-                return (
-                    self.cache[article_id]["sentiment"],
-                    self.cache[article_id]["explanation"]
-                )
+            cached_result = self._get_cached_result(article_id, model)
+            if cached_result and cached_result.get("explanation"):
+                return cached_result["sentiment"], cached_result["explanation"]
 
             # Get sentiment and explanation in one call
-            sentiment, explanation = self._analyze_sentiment_with_explanation(text, model)
+            explained = self._explain_sentiment(text, model)
             
             # Update cache if article exists
-            if article_id in self.cache:
-                self.cache[article_id]["sentiment"] = sentiment
-                self.cache[article_id]["explanation"] = explanation
+            if cached_result:
+                cached_result.update(explained)
             
-            return sentiment, explanation
+            return explained["sentiment"], explained["explanation"]
         except Exception as e:
             logger.error(f"Explanation error: {str(e)}")
             return "error", f"Failed to get explanation: {str(e)}"
\ No newline at end of file
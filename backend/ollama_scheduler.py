@@ -0,0 +1,253 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Hashable, Optional
+
+from cancellation import CancellationToken, SearchCancelled
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITY_INTERACTIVE = 0  # Live search classification
+PRIORITY_EXPLANATION = 1  # A user clicked "explain"
+PRIORITY_BACKGROUND = 2   # Prefetching, warm-up and other speculative work
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_EXPLANATION: "explanation",
+    PRIORITY_BACKGROUND: "background",
+}
+
+# Who is asking and how urgently; set per request and inherited by worker threads and tasks
+_priority = contextvars.ContextVar("ollama_priority", default=PRIORITY_INTERACTIVE)
+_tenant = contextvars.ContextVar("ollama_tenant", default="anonymous")
+# Set while running a call other callers are coalesced onto, so they can make it more urgent
+_claim = contextvars.ContextVar("ollama_claim", default=None)
+
+
+@contextmanager
+def scheduling(priority: Optional[int] = None, tenant: Optional[str] = None):
+    """Tag Ollama calls made inside the block; a priority can only be lowered, never raised."""
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(max(priority, _priority.get()))))
+    if tenant is not None:
+        tokens.append((_tenant, _tenant.set(tenant)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _Claim:
+    """Priority of a coalesced call and the tickets it is waiting on; waiters may lower the priority number."""
+
+    __slots__ = ("priority", "tickets")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.tickets = set()
+
+
+class _Ticket:
+    """One caller's place in a model queue."""
+
+    __slots__ = ("model", "priority", "tenant", "claim", "enqueued_at", "granted", "event", "notify")
+
+    def __init__(self, model: str, priority: int, tenant: str, claim: Optional[_Claim] = None,
+                 notify: Optional[Callable[[], None]] = None):
+        self.model = model
+        self.priority = priority
+        self.tenant = tenant
+        self.claim = claim
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.event = threading.Event()
+        self.notify = notify
+
+
+class _ModelQueue:
+    """Running count and per-priority, per-tenant waiting lines for one model."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.running = 0
+        self.waiting = {priority: OrderedDict() for priority in PRIORITY_NAMES}  # tenant -> deque of tickets
+        self.wait_stats = {priority: {"granted": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0} for priority in PRIORITY_NAMES}
+
+
+class OllamaScheduler:
+    """Central dispatch for Ollama calls: per-model concurrency, strict priority classes,
+    and round-robin between tenants within a class so one heavy search cannot starve others."""
+
+    def __init__(self, limit_for: Callable[[str], int]):
+        self.limit_for = limit_for
+        self._models: Dict[str, _ModelQueue] = {}
+        self._claims: Dict[Hashable, _Claim] = {}
+        self._lock = threading.Lock()
+
+    def _queue_for(self, model: str) -> _ModelQueue:
+        """Return a model's queue. Caller must hold the lock."""
+        if model not in self._models:
+            self._models[model] = _ModelQueue(max(1, self.limit_for(model)))
+        return self._models[model]
+
+    def _grant(self, queue: _ModelQueue, ticket: _Ticket):
+        """Hand a slot to a ticket. Caller must hold the lock."""
+        queue.running += 1
+        ticket.granted = True
+        waited_ms = (time.monotonic() - ticket.enqueued_at) * 1000
+        stats = queue.wait_stats[ticket.priority]
+        stats["granted"] += 1
+        stats["total_wait_ms"] += waited_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], waited_ms)
+        ticket.event.set()
+        if ticket.notify:
+            ticket.notify()
+
+    def _grant_waiting(self, queue: _ModelQueue):
+        """Fill free slots from the most urgent class, rotating through its tenants. Caller must hold the lock."""
+        while queue.running < queue.limit:
+            for priority in sorted(queue.waiting):
+                tenants = queue.waiting[priority]
+                if tenants:
+                    break
+            else:
+                return
+            tenant, tickets = next(iter(tenants.items()))
+            ticket = tickets.popleft()
+            # Send this tenant to the back of the line for its next request
+            del tenants[tenant]
+            if tickets:
+                tenants[tenant] = tickets
+            self._grant(queue, ticket)
+
+    def _enqueue(self, model: str, notify: Optional[Callable[[], None]] = None) -> _Ticket:
+        claim = _claim.get()
+        with self._lock:
+            ticket = _Ticket(model, claim.priority if claim else _priority.get(), _tenant.get(), claim, notify)
+            if claim:
+                claim.tickets.add(ticket)
+            queue = self._queue_for(model)
+            queue.waiting[ticket.priority].setdefault(ticket.tenant, deque()).append(ticket)
+            self._grant_waiting(queue)
+        return ticket
+
+    def _release(self, ticket: _Ticket):
+        """Free a granted slot, or withdraw a ticket that is still waiting."""
+        with self._lock:
+            if ticket.claim:
+                ticket.claim.tickets.discard(ticket)
+            queue = self._models[ticket.model]
+            if ticket.granted:
+                queue.running -= 1
+            else:
+                tenants = queue.waiting[ticket.priority]
+                tickets = tenants.get(ticket.tenant)
+                if tickets and ticket in tickets:
+                    tickets.remove(ticket)
+                    if not tickets:
+                        del tenants[ticket.tenant]
+            self._grant_waiting(queue)
+
+    @contextmanager
+    def shared(self, key: Hashable):
+        """Run the block's Ollama calls on behalf of everyone coalesced on key; see promote."""
+        claim = _Claim(_priority.get())
+        with self._lock:
+            self._claims[key] = claim
+        token = _claim.set(claim)
+        try:
+            yield
+        finally:
+            _claim.reset(token)
+            with self._lock:
+                if self._claims.get(key) is claim:
+                    del self._claims[key]
+
+    def promote(self, key: Hashable) -> bool:
+        """Raise the call running for key to the caller's priority, moving any ticket it is queued with."""
+        priority = _priority.get()
+        with self._lock:
+            claim = self._claims.get(key)
+            if claim is None or priority >= claim.priority:
+                return False
+            claim.priority = priority
+            for ticket in claim.tickets:
+                if ticket.granted:
+                    continue
+                queue = self._models[ticket.model]
+                tenants = queue.waiting[ticket.priority]
+                tenants[ticket.tenant].remove(ticket)
+                if not tenants[ticket.tenant]:
+                    del tenants[ticket.tenant]
+                ticket.priority = priority
+                queue.waiting[priority].setdefault(ticket.tenant, deque()).append(ticket)
+                self._grant_waiting(queue)
+            return True
+
+    @contextmanager
+    def slot(self, model: str, cancel_token: Optional[CancellationToken] = None):
+        """Block until a slot for model is free, honouring the caller's priority and tenant."""
+        ticket = self._enqueue(model)
+        unregister = cancel_token.add_callback(ticket.event.set) if cancel_token is not None else None
+        try:
+            ticket.event.wait()
+            if cancel_token is not None and cancel_token.cancelled:
+                raise SearchCancelled()
+            yield
+        finally:
+            if unregister:
+                unregister()
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def async_slot(self, model: str):
+        """Async counterpart of slot; waiting does not block the event loop."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def notify():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        ticket = self._enqueue(model, notify)
+        try:
+            await granted
+            yield
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> Dict:
+        """Return running/waiting counts and queue-wait times per model and priority class."""
+        with self._lock:
+            report = {}
+            for model, queue in self._models.items():
+                classes = {}
+                for priority, name in PRIORITY_NAMES.items():
+                    stats = queue.wait_stats[priority]
+                    classes[name] = {
+                        "waiting": sum(len(tickets) for tickets in queue.waiting[priority].values()),
+                        "granted": stats["granted"],
+                        "avg_wait_ms": round(stats["total_wait_ms"] / stats["granted"], 2) if stats["granted"] else 0.0,
+                        "max_wait_ms": round(stats["max_wait_ms"], 2),
+                    }
+                report[model] = {"limit": queue.limit, "running": queue.running, "classes": classes}
+            return report
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_ollama_scheduler(limit_for: Callable[[str], int]) -> OllamaScheduler:
+    """Return the process-wide scheduler, creating it on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = OllamaScheduler(limit_for)
+        return _scheduler
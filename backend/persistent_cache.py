@@ -0,0 +1,151 @@
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+
+from models import SentimentCache
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Persistent cache configuration; point SENTIMENT_CACHE_URL at e.g.
+# sqlite:////var/lib/sentiscope/cache.db for a single-node file cache
+PERSISTENT_CACHE_ENABLED = os.getenv("PERSISTENT_CACHE_ENABLED", "true").lower() == "true"
+SENTIMENT_CACHE_URL = os.getenv("SENTIMENT_CACHE_URL")
+
+# Maximum number of keys per SELECT ... IN (...) lookup
+LOOKUP_CHUNK_SIZE = 500
+
+# The app's model defines the table; this module only needs its Core form
+sentiment_cache_table = SentimentCache.__table__
+
+
+def normalize_title(text: str) -> str:
+    """Normalize a title for cache lookups: collapse whitespace and lowercase."""
+    return " ".join(text.split()).lower()[:512]
+
+
+class PersistentSentimentCache:
+    """Cross-process sentiment label cache stored in Postgres or a local SQLite file."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        sentiment_cache_table.create(self.engine, checkfirst=True)
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+
+    def get_many(self, texts: Iterable[str], model: str, prompt_version: str) -> Dict[str, str]:
+        """Look up labels for many texts at once, keyed by normalized title."""
+        keys = list({normalize_title(text) for text in texts})
+        found = {}
+        if not keys:
+            return found
+
+        try:
+            with self.engine.connect() as conn:
+                for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+                    chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+                    rows = conn.execute(
+                        select(sentiment_cache_table.c.title_key, sentiment_cache_table.c.sentiment).where(
+                            sentiment_cache_table.c.model == model,
+                            sentiment_cache_table.c.prompt_version == prompt_version,
+                            sentiment_cache_table.c.title_key.in_(chunk),
+                        )
+                    )
+                    found.update({title_key: sentiment for title_key, sentiment in rows})
+        except Exception as e:
+            logger.error(f"Persistent cache lookup failed: {e}")
+            return {}
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, text: str, model: str, prompt_version: str) -> Optional[str]:
+        """Look up the label for a single text."""
+        return self.get_many([text], model, prompt_version).get(normalize_title(text))
+
+    def set_many(self, entries: List[Tuple[str, str]], model: str, prompt_version: str):
+        """Store (text, sentiment) pairs in one multi-row insert, ignoring existing keys."""
+        rows = {}
+        for text, sentiment in entries:
+            rows[normalize_title(text)] = {
+                "title_key": normalize_title(text),
+                "model": model,
+                "prompt_version": prompt_version,
+                "sentiment": sentiment,
+                "created_at": datetime.utcnow(),
+            }
+        if not rows:
+            return
+
+        try:
+            with self.engine.begin() as conn:
+                dialect = self.engine.dialect.name
+                if dialect == "postgresql":
+                    stmt = postgresql.insert(sentiment_cache_table).on_conflict_do_nothing()
+                    conn.execute(stmt, list(rows.values()))
+                elif dialect == "sqlite":
+                    stmt = sqlite.insert(sentiment_cache_table).on_conflict_do_nothing()
+                    conn.execute(stmt, list(rows.values()))
+                else:
+                    for row in rows.values():
+                        try:
+                            with conn.begin_nested():
+                                conn.execute(sentiment_cache_table.insert(), row)
+                        except IntegrityError:
+                            pass
+            with self._lock:
+                self.writes += len(rows)
+        except Exception as e:
+            logger.error(f"Persistent cache write failed: {e}")
+
+    def set(self, text: str, sentiment: str, model: str, prompt_version: str):
+        """Store a single label."""
+        self.set_many([(text, sentiment)], model, prompt_version)
+
+    def stats(self) -> Dict[str, int]:
+        """Return lookup and write counters for this process."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+
+_persistent_cache = None
+_persistent_cache_lock = threading.Lock()
+
+
+def get_persistent_cache(default_engine=None) -> Optional[PersistentSentimentCache]:
+    """Return the process-wide persistent cache, or None if it is disabled or unavailable.
+
+    The cache shares default_engine (the main database) unless SENTIMENT_CACHE_URL
+    points it somewhere else.
+    """
+    global _persistent_cache
+    if not PERSISTENT_CACHE_ENABLED:
+        return None
+
+    with _persistent_cache_lock:
+        if _persistent_cache is None:
+            try:
+                if SENTIMENT_CACHE_URL:
+                    engine = create_engine(SENTIMENT_CACHE_URL, pool_pre_ping=True)
+                elif default_engine is not None:
+                    engine = default_engine
+                else:
+                    return None
+                _persistent_cache = PersistentSentimentCache(engine)
+            except Exception as e:
+                logger.error(f"Persistent sentiment cache unavailable: {e}")
+                return None
+        return _persistent_cache
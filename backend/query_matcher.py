@@ -0,0 +1,48 @@
+import logging
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Dict, List, Set
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PUNCTUATION = re.compile(r'[^\w\s]')
+WHITESPACE = re.compile(r'\s')
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and strip punctuation, the form titles and queries are matched in."""
+    return PUNCTUATION.sub('', text.lower())
+
+
+class QueryMatcher:
+    """Finds which query terms occur in titles, compiled once per search.
+
+    A title matches when any term is a substring of its normalized form. All terms are
+    compiled into one escaped alternation, longest first, inside a lookahead so matches
+    may overlap; shorter terms contained in a matched term are reported as matched too.
+    """
+
+    def __init__(self, query: str):
+        self.terms = list(dict.fromkeys(normalize_text(query).split()))
+        alternation = "|".join(re.escape(term) for term in sorted(self.terms, key=len, reverse=True))
+        self.pattern = re.compile(f"(?=({alternation}))") if self.terms else None
+        # Terms implied by a match of each term, e.g. "bitcoin" also matches "bit" and "coin"
+        self._implied: Dict[str, Set[str]] = {
+            term: {other for other in self.terms if other in term} for term in self.terms
+        }
+
+    def match_titles(self, titles: List[str]) -> List[Set[str]]:
+        """Return the matched terms for every title, normalizing and scanning the whole batch in one pass."""
+        matched = [set() for _ in titles]
+        if self.pattern is None or not titles:
+            return matched
+
+        # Newlines separate titles in the joined text; terms never contain whitespace, so no match spans two titles
+        joined = normalize_text("\n".join(WHITESPACE.sub(" ", title) for title in titles))
+        starts = [0, *accumulate(len(line) + 1 for line in joined.split("\n")[:-1])]
+
+        for match in self.pattern.finditer(joined):
+            matched[bisect_right(starts, match.start()) - 1].update(self._implied[match.group(1)])
+        return matched
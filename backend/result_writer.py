@@ -0,0 +1,195 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Dict, List
+
+from sqlalchemy import and_, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Write-behind configuration
+WRITE_BATCH_SIZE = int(os.getenv("RESULT_WRITE_BATCH_SIZE", "50"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("RESULT_WRITE_FLUSH_INTERVAL", "1.0"))
+WRITE_QUEUE_SIZE = int(os.getenv("RESULT_WRITE_QUEUE_SIZE", "10000"))
+
+_STOP = object()
+
+# Callbacks run after a flush inserts new rows, e.g. to invalidate derived caches
+_flush_listeners = []
+
+
+def add_flush_listener(callback):
+    """Register a callback called with the number of rows inserted by each flush."""
+    _flush_listeners.append(callback)
+
+
+class ResultWriter:
+    """Background writer that batches sentiment results into multi-row inserts."""
+
+    def __init__(self, engine, table, conflict_columns: List[str],
+                 batch_size: int = WRITE_BATCH_SIZE, flush_interval: float = WRITE_FLUSH_INTERVAL):
+        self.engine = engine
+        self.table = table
+        self.conflict_columns = conflict_columns
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self._upsert = None  # Whether ON CONFLICT can be used, checked on the first flush
+        self._queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "max_queue_depth": 0,
+            "last_flush_ms": 0.0,
+        }
+        self._thread = threading.Thread(target=self._run, name="result-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def enqueue(self, row: Dict):
+        """Queue a row for writing without waiting on the database."""
+        try:
+            self._queue.put(row, timeout=1)
+        except queue.Full:
+            logger.error("Result write queue is full, dropping result")
+            self._count("dropped")
+            return
+
+        self._count("enqueued")
+        with self._stats_lock:
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+
+    def _count(self, name: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def _run(self):
+        """Collect rows until the batch is full or the flush interval passes, then write them."""
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if batch:
+                self._flush(batch)
+
+        # Drain anything queued after the stop signal
+        remaining_rows = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                remaining_rows.append(item)
+        for start in range(0, len(remaining_rows), self.batch_size):
+            self._flush(remaining_rows[start:start + self.batch_size])
+
+    def _has_unique_index(self) -> bool:
+        """Whether the table in the database has a unique constraint or index on the conflict columns."""
+        try:
+            inspector = inspect(self.engine)
+            uniques = [constraint["column_names"] for constraint in inspector.get_unique_constraints(self.table.name)]
+            uniques += [index["column_names"] for index in inspector.get_indexes(self.table.name) if index.get("unique")]
+        except Exception as e:
+            logger.warning(f"Could not inspect {self.table.name} for a unique index: {str(e)}")
+            return False
+        return any(set(columns) == set(self.conflict_columns) for columns in uniques)
+
+    def _use_upsert(self) -> bool:
+        """Check once whether the dialect and schema support INSERT ... ON CONFLICT on the conflict columns."""
+        if self._upsert is None:
+            self._upsert = self.engine.dialect.name in ("postgresql", "sqlite") and self._has_unique_index()
+            if not self._upsert:
+                logger.warning(
+                    f"No unique index on {self.table.name} ({', '.join(self.conflict_columns)}), "
+                    "writing results row by row; run `flask db upgrade` to enable batched inserts"
+                )
+        return self._upsert
+
+    def _insert_statement(self, rows: List[Dict]):
+        """Build a multi-row INSERT that skips rows violating the unique index."""
+        insert = postgresql.insert if self.engine.dialect.name == "postgresql" else sqlite.insert
+        return insert(self.table).values(rows).on_conflict_do_nothing(index_elements=self.conflict_columns)
+
+    def _insert_rows(self, conn, rows: List[Dict]) -> int:
+        """Insert rows one at a time, skipping existing ones, so a duplicate never fails the batch."""
+        inserted = 0
+        for row in rows:
+            existing = select(self.table.c[self.conflict_columns[0]]).where(
+                and_(*(self.table.c[column] == row[column] for column in self.conflict_columns))
+            ).limit(1)
+            if conn.execute(existing).first() is not None:
+                continue
+            try:
+                with conn.begin_nested():
+                    conn.execute(self.table.insert().values(row))
+                inserted += 1
+            except IntegrityError:
+                pass
+        return inserted
+
+    def _flush(self, rows: List[Dict]):
+        """Write one batch of rows, in a single statement when the unique index allows it."""
+        start = time.perf_counter()
+        try:
+            with self.engine.begin() as conn:
+                if self._use_upsert():
+                    inserted = conn.execute(self._insert_statement(rows)).rowcount
+                    inserted = inserted if inserted is not None and inserted >= 0 else len(rows)
+                else:
+                    inserted = self._insert_rows(conn, rows)
+            with self._stats_lock:
+                self._stats["written"] += inserted
+                self._stats["duplicates"] += len(rows) - inserted
+                self._stats["flushes"] += 1
+                self._stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+            logger.info(f"Saved {inserted} sentiment results, skipped {len(rows) - inserted} duplicates")
+        except Exception as e:
+            self._count("failed", len(rows))
+            logger.error(f"Error saving {len(rows)} results to database: {str(e)}")
+            return
+
+        if inserted:
+            for callback in _flush_listeners:
+                try:
+                    callback(inserted)
+                except Exception as e:
+                    logger.error(f"Flush listener failed: {str(e)}")
+
+    def close(self, timeout: float = 10.0):
+        """Flush every queued row and stop the background thread."""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict:
+        """Return queue depth and write counters."""
+        with self._stats_lock:
+            return dict(self._stats, queue_depth=self._queue.qsize())
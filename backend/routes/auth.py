@@ -2,7 +2,6 @@ from flask import Blueprint, render_template, request, redirect, url_for
 from flask_login import login_user, logout_user, current_user, login_required
 import os
 import json
-import requests
 from oauthlib.oauth2 import WebApplicationClient
 from dotenv import load_dotenv
 load_dotenv()
@@ -12,8 +11,10 @@ os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 # Try both import styles to handle different run contexts
 try:
     from models import User
+    from http_client import get_session, get_timeout
 except ImportError:
     from models import User
+    from http_client import get_session, get_timeout
 
 # Create blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -29,7 +30,7 @@ def login():
     if current_user.is_authenticated:
         return redirect(url_for('index.index'))
 
-    google_provider_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
+    google_provider_cfg = get_session("google").get(GOOGLE_DISCOVERY_URL, timeout=get_timeout("google")).json()
 
     # Dynamically determine redirect URI
     base_url = request.host_url.rstrip("/")  # e.g. http://localhost:5000 or http://127.0.0.1:5000
@@ -52,7 +53,7 @@ def callback():
         return redirect(url_for("index.index"))
 
     code = request.args.get("code")
-    google_cfg = requests.get(GOOGLE_DISCOVERY_URL).json()
+    google_cfg = get_session("google").get(GOOGLE_DISCOVERY_URL, timeout=get_timeout("google")).json()
 
     base_url = request.host_url.rstrip("/")
     redirect_uri = f"{base_url}/login/callback"
@@ -63,12 +64,12 @@ def callback():
         redirect_url=redirect_uri,
         code=code
     )
-    token_response = requests.post(token_url, headers=headers, data=body, auth=(GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET))
+    token_response = get_session("google").post(token_url, headers=headers, data=body, auth=(GOOGLE_CLIENT_ID, GOOGLE_CLIENT_SECRET), timeout=get_timeout("google"))
     print(f"Token response: {token_response.json()}")
     client.parse_request_body_response(json.dumps(token_response.json()))
 
     uri, headers, _ = client.add_token(google_cfg["userinfo_endpoint"])
-    userinfo_response = requests.get(uri, headers=headers)
+    userinfo_response = get_session("google").get(uri, headers=headers, timeout=get_timeout("google"))
     print(f"User info response: {userinfo_response.json()}")
     userinfo = userinfo_response.json()
 
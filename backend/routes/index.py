@@ -1,23 +1,66 @@
 from flask import Blueprint, render_template, request, jsonify, Response, stream_with_context
 import json
 from flask_login import current_user
+import uuid
 
 # Try both import styles to handle different run contexts
 try:
     from news_source_helper import NewsSentimentAnalyzer
     from video_source_helper import YouTubeSentimentAnalyzer
+    from routes.admin import admin_required
+    from models import db
+    from cancellation import (CancellationToken, active_search_count, cancel_search, iter_with_heartbeat,
+                              register_search, unregister_search)
+    from single_flight import single_flight
+    from ollama_scheduler import scheduling
+    from upstream_cache import upstream_cache
+    from sentiment_cache import route_cache
+    from fan_out import merge_streams, merge_streams_async
+    from model_warmup import get_model_warmer
+    from sentiment_analyzer import OLLAMA_API_URL
 except ImportError:
     from news_source_helper import NewsSentimentAnalyzer
     from video_source_helper import YouTubeSentimentAnalyzer
+    from backend.routes.admin import admin_required
+    from models import db
+    from cancellation import (CancellationToken, active_search_count, cancel_search, iter_with_heartbeat,
+                              register_search, unregister_search)
+    from single_flight import single_flight
+    from ollama_scheduler import scheduling
+    from upstream_cache import upstream_cache
+    from sentiment_cache import route_cache
+    from fan_out import merge_streams, merge_streams_async
+    from model_warmup import get_model_warmer
+    from sentiment_analyzer import OLLAMA_API_URL
 
 # Create blueprint
 index_bp = Blueprint('index', __name__)
 
-# Initialize analyzers
-news_analyzer = NewsSentimentAnalyzer()
-video_analyzer = YouTubeSentimentAnalyzer()
+# Pipelines run side by side for the combined category, keyed by the source_type tag on their events
+FAN_OUT_CATEGORIES = {'news': 'online_news', 'video': 'online_videos'}
+
+# Analyzers are created on the app's engine when the blueprint is registered
+news_analyzer = None
+video_analyzer = None
+model_warmer = None
+
+@index_bp.record_once
+def init_analyzers(state):
+    """Create the analyzers on the app's engine and connection pool, and start warming up models."""
+    global news_analyzer, video_analyzer, model_warmer
+    with state.app.app_context():
+        news_analyzer = NewsSentimentAnalyzer(engine=db.engine)
+        video_analyzer = YouTubeSentimentAnalyzer(engine=db.engine)
+    if state.app.config.get("START_MODEL_WARMUP", True):
+        model_warmer = get_model_warmer(OLLAMA_API_URL, news_analyzer.scheduler)
 
 # Helper function
+def request_tenant():
+    """Identify who a request's Ollama calls are queued for: the user, or the client address when anonymous."""
+    if current_user.is_authenticated:
+        return f"user:{current_user.id}"
+    return f"ip:{request.remote_addr}"
+
 def generate_safe_id(url):
     """Generate a safe ID from a URL for use in the frontend."""
     import hashlib
@@ -30,42 +73,106 @@ def index():
     return render_template("login.html", user=current_user)
 
 
-@index_bp.route('/search')
-def search():
-    data = json.loads(request.args.get('data'))
+def start_search(data, use_async=False, cancel_token=None):
+    """Start the news, video or combined pipeline for a search request, or return None for an unknown category.
+
+    The sync pipeline stops on cancel_token; the async one is stopped by cancelling its task.
+    """
     category = data.get('category', 'online_news')
+    if category == 'all_sources':
+        return start_fan_out_search(data, use_async, cancel_token)
+
+    options = {} if use_async else {'cancel_token': cancel_token}
 
     if category == 'online_news':
-        results = news_analyzer.get_news_results(
+        get_results = news_analyzer.get_news_results_async if use_async else news_analyzer.get_news_results
+        return get_results(
             query=data['query'],
             source=data.get('source'),
             num_articles=int(data.get('num_articles', 10)),
             sort_by=data.get('sort_by', 'popularity'),
             country=data.get('country'),
-            model=data.get('model', 'gemma3:1b')
+            model=data.get('model', 'gemma3:1b'),
+            **options
         )
     elif category == 'online_videos':
-        results = video_analyzer.get_video_results(
+        get_results = video_analyzer.get_video_results_async if use_async else video_analyzer.get_video_results
+        return get_results(
             query=data['query'],
             platform=data.get('platform', 'youtube'),
             num_videos=int(data.get('num_videos', 10)),
             sort_by=data.get('video_sort', 'viewCount'),
             country=data.get('country', 'us'),
             channel=data.get('channel'),
-            model=data.get('model', 'gemma3:1b')
+            model=data.get('model', 'gemma3:1b'),
+            **options
         )
-    else:
-        return jsonify({"error": f"Unsupported category: {category}"}), 400
+    return None
+
+def start_fan_out_search(data, use_async=False, cancel_token=None):
+    """Run the news and video pipelines concurrently, merged into one stream of source-tagged events."""
+    if use_async:
+        return merge_streams_async({
+            source_type: start_search(dict(data, category=category), use_async=True)
+            for source_type, category in FAN_OUT_CATEGORIES.items()
+        })
+
+    sources = {}
+    for source_type, category in FAN_OUT_CATEGORIES.items():
+        # Each source has its own token so one can time out while the other continues
+        source_token = CancellationToken()
+        if cancel_token is not None:
+            cancel_token.add_callback(source_token.cancel)
+        sources[source_type] = (start_search(dict(data, category=category), cancel_token=source_token), source_token)
+    return merge_streams(sources)
+
+def format_event(result):
+    """Serialize a search result as a server-sent event."""
+    if 'id' not in result:
+        result['id'] = generate_safe_id(result.get('url', ''))
+    return f"data: {json.dumps(result)}\n\n"
+
+@index_bp.route('/search')
+def search():
+    data = json.loads(request.args.get('data'))
+    tenant = request_tenant()
+    search_id = data.get('search_id') or uuid.uuid4().hex
+    cancel_token = register_search(search_id)
+    results = start_search(data, cancel_token=cancel_token)
+    if results is None:
+        unregister_search(search_id, cancel_token)
+        return jsonify({"error": f"Unsupported category: {data.get('category')}"}), 400
 
     @stream_with_context
     def generate():
-        for result in results:
-            if 'id' not in result:
-                result['id'] = generate_safe_id(result.get('url', ''))
-            yield f"data: {json.dumps(result)}\n\n"
+        # Flush the response headers straight away so the client sees the stream open
+        yield ": connected\n\n"
+        try:
+            # Ollama calls for this stream are queued fairly against other users' searches
+            with scheduling(tenant=tenant):
+                for result in iter_with_heartbeat(results, cancel_token):
+                    if cancel_token.cancelled:
+                        break
+                    # Comments are ignored by EventSource but fail fast once the client has gone
+                    yield format_event(result) if result is not None else ": keep-alive\n\n"
+        except GeneratorExit:
+            # Client disconnected: stop queued batches and abort in-flight Ollama calls
+            cancel_token.cancel()
+            raise
+        finally:
+            unregister_search(search_id, cancel_token)
 
     return Response(generate(), mimetype='text/event-stream')
 
+@index_bp.route('/cancel-search', methods=['POST'])
+def cancel_search_request():
+    """Stop a running search stream and the classification work behind it."""
+    data = request.get_json(silent=True) or {}
+    search_id = data.get('search_id')
+    if not search_id:
+        return jsonify({"error": "Missing search_id"}), 400
+    return jsonify({"cancelled": cancel_search(search_id)})
+
 @index_bp.route('/get-explanation/<string:id>')
 def get_explanation(id):
     text = request.args.get('text')
@@ -77,11 +184,30 @@ def get_explanation(id):
 
     try:
         analyzer = video_analyzer if source_type == 'video' else news_analyzer
-        sentiment, explanation = analyzer.get_sentiment_explanation(id, text, model)
+        with scheduling(tenant=request_tenant()):
+            sentiment, explanation = analyzer.get_sentiment_explanation(id, text, model)
         return jsonify({
             "sentiment": sentiment, 
             "explanation": explanation,
             "model": model  
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+@index_bp.route('/api/metrics')
+@admin_required
+def metrics():
+    """Expose runtime performance counters for the analysis pipeline."""
+    persistent_cache = news_analyzer.persistent_cache
+    return jsonify({
+        "cache": news_analyzer.cache.stats(),
+        "route_cache": route_cache.stats(),
+        "persistent_cache": persistent_cache.stats() if persistent_cache else None,
+        "result_writer": news_analyzer.writer.stats(),
+        "active_searches": active_search_count(),
+        "coalescing": single_flight.stats(),
+        "explanation_prefetch": news_analyzer.prefetcher.stats(),
+        "ollama_scheduler": news_analyzer.scheduler.stats(),
+        "models": model_warmer.stats() if model_warmer else None,
+        "upstream_cache": upstream_cache.stats()
+    })
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, jsonify, request, current_app
+from flask import Blueprint, render_template, jsonify, request, current_app, Response, stream_with_context
 from flask_login import current_user, login_required
 from datetime import datetime
+from sqlalchemy.orm import joinedload
+import json
 from models import Feedback
 import uuid
 import traceback
@@ -8,32 +10,88 @@ import traceback
 # Try both import styles to handle different run contexts
 try:
     from models import db, Feedback
+    from routes.model_performance import invalidate_model_performance_cache
 except ImportError:
     from models import db, Feedback
+    from backend.routes.model_performance import invalidate_model_performance_cache
 
 # Create blueprint
 model_feedback_bp = Blueprint('model_feedback', __name__)
 
+# Feedback page size limits
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Request args mapped to the Feedback columns they filter on
+FEEDBACK_FILTERS = {
+    'model': Feedback.model_used,
+    'sentiment': Feedback.predicted_sentiment,
+    'feedback_type': Feedback.feedback_type,
+}
+
+def filtered_feedback_query():
+    """Feedback query with the user eagerly loaded and request filters applied"""
+    query = db.session.query(Feedback).options(joinedload(Feedback.user))
+    for arg, column in FEEDBACK_FILTERS.items():
+        value = request.args.get(arg)
+        if value:
+            query = query.filter(column == value)
+    return query
+
 @model_feedback_bp.route('/model_feedback')
 @login_required
 def model_feedback():
-    try:
-        feedback_data = db.session.query(Feedback).all()
-        return render_template('model_feedback.html', feedback_data=[f.to_dict() for f in feedback_data], user=current_user)
-    except Exception as e:
-        model_feedback_bp.logger.error(f"Feedback error: {str(e)}")
-        return render_template('error.html', message="Could not load feedback data", user=current_user)
+    # Rows are fetched page by page from the API, so rendering never touches the table
+    return render_template('model_feedback.html', user=current_user)
 
 @model_feedback_bp.route('/api/model_feedback_stats')
 @login_required
 def get_model_stats():
+    """Return one page of feedback, newest first, using the last seen id as the cursor"""
     try:
-        feedback_data = db.session.query(Feedback).join(Feedback.user).all()
-        return jsonify([f.to_dict() for f in feedback_data])
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        before_id = request.args.get('before_id', type=int)
+
+        query = filtered_feedback_query()
+        if before_id:
+            query = query.filter(Feedback.id < before_id)
+        feedback_data = query.order_by(Feedback.id.desc()).limit(limit).all()
+
+        next_before_id = feedback_data[-1].id if len(feedback_data) == limit else None
+        return jsonify({
+            "results": [f.to_dict() for f in feedback_data],
+            "next_before_id": next_before_id
+        })
     except Exception as e:
-        model_feedback_bp.logger.error(f"Model stats error: {str(e)}")
+        current_app.logger.error(f"Model stats error: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@model_feedback_bp.route('/api/model_feedback_stats/export')
+@login_required
+def export_model_stats():
+    """Stream every matching feedback row as NDJSON (default) or a JSON array"""
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'json'):
+        return jsonify({"error": "format must be 'ndjson' or 'json'"}), 400
+
+    rows = filtered_feedback_query().order_by(Feedback.id).yield_per(500)
+
+    @stream_with_context
+    def generate():
+        if export_format == 'ndjson':
+            for feedback in rows:
+                yield json.dumps(feedback.to_dict()) + "\n"
+        else:
+            yield "["
+            for index, feedback in enumerate(rows):
+                yield ("," if index else "") + json.dumps(feedback.to_dict())
+            yield "]"
+
+    mimetype = 'application/x-ndjson' if export_format == 'ndjson' else 'application/json'
+    return Response(generate(), mimetype=mimetype, headers={
+        "Content-Disposition": f"attachment; filename=model_feedback.{export_format}"
+    })
+
 
 @model_feedback_bp.route('/submit-feedback', methods=['POST'])
 def submit_feedback():
@@ -86,6 +144,7 @@ def submit_feedback():
         
         db.session.add(feedback)
         db.session.commit()
+        invalidate_model_performance_cache()
         
         current_app.logger.info(f"Successfully saved feedback with ID: {feedback.id}")
         return jsonify({"status": "success", "message": "Feedback submitted successfully"})
@@ -1,15 +1,27 @@
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request, current_app
 from flask_login import current_user
+from datetime import datetime, timedelta
+from sqlalchemy import case, func
 
 # Try both import styles to handle different run contexts
 try:
     from models import db, Feedback
+    from sentiment_cache import route_cache
 except ImportError:
     from models import db, Feedback
+    from sentiment_cache import route_cache
 
 # Create blueprint
 model_performance_bp = Blueprint('model_performance', __name__)
 
+def invalidate_model_performance_cache():
+    """Drop cached stats so new feedback is reflected immediately."""
+    route_cache.clear_namespace("model_performance")
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD query parameter, returning None if absent."""
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
 @model_performance_bp.route('/model_performance')
 def model_performance():
     """Render the model performance page."""
@@ -19,24 +31,41 @@ def model_performance():
 def get_model_performance_stats():
     """Get stats for model performance based on user feedback."""
     try:
-        # First get all unique models
-        models = db.session.query(Feedback.model_used).distinct().all()
-        models = [model[0] for model in models if model[0]]  # Filter out None/empty values
+        start_date = parse_date(request.args.get('start_date'))
+        end_date = parse_date(request.args.get('end_date'))
+        source_type = request.args.get('source_type')
+    except ValueError:
+        return jsonify({"error": "Dates must use the YYYY-MM-DD format"}), 400
+
+    cache_key = f"{start_date}|{end_date}|{source_type}"
+    cached = route_cache.get("model_performance", cache_key)
+    if cached is not None:
+        return jsonify(cached)
+
+    try:
+        # One grouped query with conditional counts instead of two COUNTs per model
+        thumbs_up_count = func.sum(case((Feedback.feedback_type == 'thumbs_up', 1), else_=0))
+        thumbs_down_count = func.sum(case((Feedback.feedback_type == 'thumbs_down', 1), else_=0))
+        query = db.session.query(Feedback.model_used, thumbs_up_count, thumbs_down_count).filter(
+            Feedback.model_used.isnot(None),
+            Feedback.model_used != ''
+        )
+
+        if start_date:
+            query = query.filter(Feedback.timestamp >= start_date)
+        if end_date:
+            # Include the whole end day
+            query = query.filter(Feedback.timestamp < end_date + timedelta(days=1))
+        if source_type:
+            query = query.filter(Feedback.source_type == source_type)
+
+        rows = query.group_by(Feedback.model_used).order_by(Feedback.model_used).all()
         
         result = []
-        for model in models:
-            # Get thumbs up count
-            thumbs_up = db.session.query(Feedback).filter(
-                Feedback.model_used == model,
-                Feedback.feedback_type == 'thumbs_up'
-            ).count()
-            
-            # Get thumbs down count
-            thumbs_down = db.session.query(Feedback).filter(
-                Feedback.model_used == model,
-                Feedback.feedback_type == 'thumbs_down'
-            ).count()
-            
+        for model, thumbs_up, thumbs_down in rows:
+            thumbs_up = int(thumbs_up or 0)
+            thumbs_down = int(thumbs_down or 0)
+
             # Calculate total and percentages
             total = thumbs_up + thumbs_down
             up_percentage = (thumbs_up / total * 100) if total > 0 else 0
@@ -50,8 +79,9 @@ def get_model_performance_stats():
                 'up_percentage': up_percentage,
                 'down_percentage': down_percentage
             })
-            
+
+        route_cache.set("model_performance", cache_key, result)
         return jsonify(result)
     except Exception as e:
-        model_performance_bp.logger.error(f"Model performance stats error: {str(e)}")
+        current_app.logger.error(f"Model performance stats error: {str(e)}")
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
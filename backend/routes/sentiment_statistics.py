@@ -1,15 +1,20 @@
 """Routes for the sentiment_statistics page."""
-from flask import Blueprint, render_template, jsonify, current_app
+from flask import Blueprint, render_template, jsonify, current_app, request
 from flask_login import current_user
+from sqlalchemy import func
 import traceback
 import logging
 
 # Try both import styles to handle different run contexts
 try:
     from models import db, SentimentResults
+    from sentiment_cache import route_cache
+    from result_writer import add_flush_listener
 except ImportError:
     try:
         from models import db, SentimentResults
+        from sentiment_cache import route_cache
+        from result_writer import add_flush_listener
     except ImportError:
         print("CRITICAL: Could not import database models!")
 
@@ -22,6 +27,13 @@ handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s -
 logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
+# Columns that can be used to filter statistics queries
+FILTER_COLUMNS = ('query', 'source', 'model', 'sentiment', 'category')
+
+# Raw row page size limits
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 def get_logger():
     """Get the appropriate logger - either from the app or local"""
     try:
@@ -34,81 +46,110 @@ def sentiment_statistics():
     """Render the sentiment_statistics page template"""
     return render_template('sentiment_statistics.html', user=current_user)
 
+def apply_filters(query):
+    """Restrict a SentimentResults query to the filters given in the request args"""
+    for column in FILTER_COLUMNS:
+        value = request.args.get(column)
+        if value:
+            query = query.filter(getattr(SentimentResults, column) == value)
+    return query
+
 @sentiment_statistics_bp.route('/api/sentiment_statistics')
 def get_sentiment_statistics():
-    """API endpoint to retrieve all sentiment results"""
+    """API endpoint to retrieve a page of raw sentiment results, ordered by id"""
     log = get_logger()
     
     try:
-        log.info("Retrieving sentiment results from database")
-        results = db.session.query(SentimentResults).all()
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        after_id = request.args.get('after_id', 0, type=int)
+        
+        log.info(f"Retrieving up to {limit} sentiment results after id {after_id}")
+        query = apply_filters(db.session.query(SentimentResults)).filter(SentimentResults.id > after_id)
+        results = query.order_by(SentimentResults.id).limit(limit).all()
         
-        # Convert to dictionaries
-        formatted_results = []
-        for result in results:
-            try:
-                if hasattr(result, 'to_dict'):
-                    result_dict = result.to_dict()
-                else:
-                    result_dict = {
-                        'Query': getattr(result, 'Query', None),
-                        'Source': getattr(result, 'Source', None),
-                        'Model': getattr(result, 'Model', None),
-                        'Sentiment': getattr(result, 'Sentiment', None),
-                    }
-                formatted_results.append(result_dict)
-            except Exception as item_error:
-                log.error(f"Error converting item to dict: {str(item_error)}")
+        formatted_results = [result.to_dict() for result in results]
+        next_after_id = results[-1].id if len(results) == limit else None
         
         log.info(f"Successfully retrieved {len(formatted_results)} sentiment results")
-        return jsonify(formatted_results)
+        return jsonify({"results": formatted_results, "next_after_id": next_after_id})
     except Exception as e:
         log.error(f"sentiment_statistics API error: {str(e)}")
         log.error(traceback.format_exc())
         return jsonify({"error": str(e), "message": "Failed to retrieve sentiment data"}), 500
 
+@sentiment_statistics_bp.route('/api/sentiment_statistics/aggregate')
+def get_sentiment_aggregates():
+    """API endpoint returning result counts grouped by query, source, model and sentiment"""
+    log = get_logger()
+    
+    try:
+        group_columns = (
+            SentimentResults.query,
+            SentimentResults.source,
+            SentimentResults.model,
+            SentimentResults.sentiment,
+        )
+        query = apply_filters(db.session.query(*group_columns, func.count(SentimentResults.id)))
+        rows = query.group_by(*group_columns).order_by(*group_columns).all()
+        
+        aggregates = [
+            {
+                'query': query_text,
+                'source': source,
+                'model': model,
+                'sentiment': sentiment,
+                'count': count
+            }
+            for query_text, source, model, sentiment, count in rows
+        ]
+        
+        log.info(f"Aggregated sentiment results into {len(aggregates)} groups")
+        return jsonify(aggregates)
+    except Exception as e:
+        log.error(f"Sentiment aggregate API error: {str(e)}")
+        log.error(traceback.format_exc())
+        return jsonify({"error": str(e), "message": "Failed to aggregate sentiment data"}), 500
+
+def invalidate_combinations_cache(inserted=None):
+    """Drop the cached combinations so new results show up in the filters"""
+    route_cache.delete("combinations", "all")
+
+# New rows written by this process invalidate immediately; other workers rely on the TTL
+add_flush_listener(invalidate_combinations_cache)
+
 @sentiment_statistics_bp.route('/api/valid-combinations')
 def get_valid_combinations():
     """Return all valid query/source/model combinations that exist in the database"""
     log = get_logger()
     
     try:
-        log.info("Starting valid combinations query")
+        combinations = route_cache.get("combinations", "all")
+        if combinations is not None:
+            return jsonify(combinations)
         
-        # First try to get the data from the sentiment_statistics endpoint as a fallback
-        sentiment_statistics_data = []
-        try:
-            results = db.session.query(SentimentResults).all()
-            for result in results:
-                if hasattr(result, 'to_dict'):
-                    sentiment_statistics_data.append(result.to_dict())
-                else:
-                    sentiment_statistics_data.append({
-                        'Query': getattr(result, 'Query', None),
-                        'Source': getattr(result, 'Source', None),
-                        'Model': getattr(result, 'Model', None),
-                    })
-        except Exception as sentiment_statistics_error:
-            log.error(f"Error getting sentiment_statistics data: {str(sentiment_statistics_error)}")
+        log.info("Starting valid combinations query")
         
-        # Generate combinations from the sentiment_statistics data as a super-safe fallback
-        combinations = []
-        seen = set()
+        # Single DISTINCT query served by the (query, source, model, sentiment) index
+        rows = db.session.query(
+            SentimentResults.query,
+            SentimentResults.source,
+            SentimentResults.model
+        ).filter(
+            SentimentResults.query.isnot(None),
+            SentimentResults.source.isnot(None),
+            SentimentResults.model.isnot(None)
+        ).distinct().order_by(
+            SentimentResults.query,
+            SentimentResults.source,
+            SentimentResults.model
+        ).all()
         
-        for item in sentiment_statistics_data:
-            if not item.get('Query') or not item.get('Source') or not item.get('Model'):
-                continue
-                
-            key = f"{item.get('Query')}_{item.get('Source')}_{item.get('Model')}"
-            if key in seen:
-                continue
-                
-            seen.add(key)
-            combinations.append({
-                "query": item.get('Query'),
-                "source": item.get('Source'),
-                "model": item.get('Model')
-            })
+        combinations = [
+            {"query": query_text, "source": source, "model": model}
+            for query_text, source, model in rows
+            if query_text and source and model
+        ]
+        route_cache.set("combinations", "all", combinations)
         
         log.info(f"Generated {len(combinations)} valid combinations")
         return jsonify(combinations)
@@ -116,4 +157,4 @@ def get_valid_combinations():
     except Exception as e:
         log.error(f"Valid combinations API error: {str(e)}")
         log.error(traceback.format_exc())
-        return jsonify({"error": str(e), "message": "Failed to retrieve valid combinations"}), 500
\ No newline at end of file
+        return jsonify({"error": str(e), "message": "Failed to retrieve valid combinations"}), 500
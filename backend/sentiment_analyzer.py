@@ -1,13 +1,25 @@
+import asyncio
+import contextvars
 import logging
+import json
 import requests
 import re
 import os
-import hashlib
-from typing import Tuple, Set
-from sqlalchemy import create_engine, Column, Integer, String
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import AsyncGenerator, Callable, Dict, Generator, List, Optional, Tuple
+from sqlalchemy import create_engine, Column, Index, Integer, String, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from http_client import async_request, get_async_client, get_session, get_timeout
+from cancellation import CancellationToken, SearchCancelled
+from sentiment_cache import sentiment_cache
+from persistent_cache import get_persistent_cache, normalize_title
+from result_writer import ResultWriter
+from single_flight import single_flight
+from explanation_prefetcher import EXPLANATION_PREFETCH_COUNT, get_explanation_prefetcher
+from ollama_scheduler import PRIORITY_EXPLANATION, get_ollama_scheduler, scheduling
+from model_warmup import OLLAMA_KEEP_ALIVE
 
 load_dotenv()
 
@@ -17,6 +29,30 @@ logger = logging.getLogger(__name__)
 # API Configuration
 OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/chat")
 
+# Concurrency configuration: default limit plus optional per-model overrides,
+# e.g. OLLAMA_MODEL_CONCURRENCY="gemma3:1b=4,deepseek-r1:14b=1"
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4"))
+OLLAMA_MODEL_CONCURRENCY = os.getenv("OLLAMA_MODEL_CONCURRENCY", "")
+
+# Number of titles packed into one classification prompt (1 disables batching)
+OLLAMA_BATCH_SIZE = int(os.getenv("OLLAMA_BATCH_SIZE", "8"))
+
+# Single-label replies are streamed and cut off as soon as the label has been read
+OLLAMA_STREAM_LABELS = os.getenv("OLLAMA_STREAM_LABELS", "true").lower() == "true"
+OLLAMA_LABEL_NUM_PREDICT = int(os.getenv("OLLAMA_LABEL_NUM_PREDICT", "8"))
+LABEL_STOP_SEQUENCES = ["\n", "."]
+
+# Reasoning models think before answering, so they get a larger token budget and no stop
+# sequences (which would end the reasoning); comma-separated model name prefixes
+OLLAMA_REASONING_MODELS = os.getenv("OLLAMA_REASONING_MODELS", "deepseek-r1")
+OLLAMA_REASONING_NUM_PREDICT = int(os.getenv("OLLAMA_REASONING_NUM_PREDICT", "1024"))
+THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+VALID_SENTIMENTS = ("positive", "negative", "neutral")
+
+# Bump whenever the classification prompts change so persisted labels are not reused
+PROMPT_VERSION = "v1"
+
 # Database configuration
 SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL')
 SQLALCHEMY_TRACK_MODIFICATIONS = False
@@ -35,110 +71,193 @@ class SentimentResult(Base):
     source = Column(String)
     model = Column(String)
     
+    __table_args__ = (
+        UniqueConstraint('title', 'source', 'model', name='unique_title_source_model'),
+        Index('ix_sentiment_results_query_source_model_sentiment', 'query', 'source', 'model', 'sentiment'),
+    )
+    
     def __repr__(self):
         return f"<SentimentResult(title='{self.title}', sentiment='{self.sentiment}')>"
 
+_result_writer = None
+_result_writer_lock = threading.Lock()
+
+def get_result_writer(engine) -> ResultWriter:
+    """Return the process-wide write-behind queue for sentiment results."""
+    global _result_writer
+    with _result_writer_lock:
+        if _result_writer is None:
+            _result_writer = ResultWriter(engine, SentimentResult.__table__, ["title", "source", "model"])
+        return _result_writer
+
+# Classification batches queued or running across every search in this process
+_foreground_batches = 0
+_foreground_lock = threading.Lock()
+
+def _track_foreground(delta: int):
+    global _foreground_batches
+    with _foreground_lock:
+        _foreground_batches += delta
+
+def foreground_queue_depth() -> int:
+    """Return the number of classification batches queued or running for searches."""
+    with _foreground_lock:
+        return _foreground_batches
+
+def _parse_model_concurrency(spec: str) -> Dict[str, int]:
+    """Parse a 'model=limit,model=limit' string into per-model concurrency limits."""
+    limits = {}
+    for entry in spec.split(","):
+        if "=" not in entry:
+            continue
+        model, limit = entry.rsplit("=", 1)
+        try:
+            limits[model.strip()] = max(1, int(limit))
+        except ValueError:
+            logger.warning(f"Ignoring invalid concurrency limit for model '{model.strip()}': {limit}")
+    return limits
+
+def _visible_reply(content: str) -> Optional[str]:
+    """Drop <think> reasoning from a reply, returning None while a reasoning block is still open."""
+    visible = THINK_BLOCK.sub("", content)
+    if "<think>" in visible:
+        return None
+    return visible.lstrip()
+
+def _label_complete(content: str) -> bool:
+    """Whether a partial reply already decides the label, i.e. its first visible word is finished."""
+    visible = _visible_reply(content)
+    if not visible:
+        return False
+    first_word = visible.split()[0]
+    return first_word.lower().rstrip('.,!?;:') in VALID_SENTIMENTS or len(visible) > len(first_word)
+
 class BaseSentimentAnalyzer:
-    def __init__(self):
-        self.cache = {}
-        self.timeout = 300  # Increased timeout for Ollama requests
-        
-        # Setup database connection
-        self.engine = create_engine(SQLALCHEMY_DATABASE_URI)
+    # Cache namespace for full search results; set by each subclass
+    result_namespace = "results"
+
+    def __init__(self, engine=None):
+        # Share the app's engine and connection pool when one is provided
+        self.engine = engine if engine is not None else create_engine(SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
         Base.metadata.create_all(self.engine)
         
-        # Create session factory
-        Session = sessionmaker(bind=self.engine)
-        self.session = Session()
+        self.cache = sentiment_cache
+        self.persistent_cache = get_persistent_cache(self.engine)
         
-        # Load existing title+source combinations from DB to avoid duplicates
-        self.existing_entries = self._load_existing_entries()
+        # Concurrent requests for the same classification share one Ollama call
+        self.inflight = single_flight
         
-    def __del__(self):
-        """Close the session when the object is deleted"""
-        if hasattr(self, 'session'):
-            self.session.close()
-    
-    def _load_existing_entries(self) -> Set[str]:
-        """Load existing title+source combinations from database to prevent duplicates."""
-        existing_entries = set()
+        # Pooled keep-alive session and split (connect, read) timeouts for Ollama
+        self.http = get_session("ollama")
+        self.timeout = get_timeout("ollama")
         
-        try:
-            # Query all title+source combinations
-            results = self.session.query(SentimentResult.title, SentimentResult.source).all()
-            
-            for title, source in results:
-                if title and source:
-                    entry_key = f"{title.strip()}|{source.strip()}"
-                    entry_hash = hashlib.md5(entry_key.encode('utf-8')).hexdigest()
-                    existing_entries.add(entry_hash)
-            
-                
-        except Exception as e:
-            logger.error(f"Error loading existing entries: {e}")
-                
-        return existing_entries
-
-    def _is_duplicate_entry(self, title: str, source: str, model: str) -> bool:
-        """Check if a title+source+model combination already exists."""
-        entry_key = f"{title.strip()}|{source.strip()}|{model.strip()}"
-        entry_hash = hashlib.md5(entry_key.encode('utf-8')).hexdigest()
-        return entry_hash in self.existing_entries
-
-    def _add_to_existing_entries(self, title: str, source: str, model: str):
-        """Add a title+source+model combination to the set of existing entries."""
-        entry_key = f"{title.strip()}|{source.strip()}|{model.strip()}"
-        entry_hash = hashlib.md5(entry_key.encode('utf-8')).hexdigest()
-        self.existing_entries.add(entry_hash)
+        # Every Ollama call waits for a per-model slot, handed out by priority and fairly across users
+        self.model_concurrency = _parse_model_concurrency(OLLAMA_MODEL_CONCURRENCY)
+        self.scheduler = get_ollama_scheduler(self._get_model_concurrency)
+        
+        # Results are written in batches from a background thread
+        self.writer = get_result_writer(self.engine)
+        
+        # Explanations for top results are generated in the background when searches are idle
+        self.prefetcher = get_explanation_prefetcher(foreground_queue_depth)
+
+    def _get_cached_result(self, item_id, model: str):
+        """Return the cached search result for an item analyzed with the given model."""
+        return self.cache.get(self.result_namespace, f"{model}:{item_id}")
+
+    def _add_to_cache(self, item_id, result: Dict, model: str):
+        """Cache a search result, tagged with the model that produced it."""
+        result['model'] = model
+        self.cache.set(self.result_namespace, f"{model}:{item_id}", result)
     
     def _save_to_database(self, query, category, title, sentiment, source, model):
-        """Save a sentiment result to the database."""
-        try:
-            new_result = SentimentResult(
-                query=query,
-                category=category,
-                title=title,
-                sentiment=sentiment,
-                source=source,
-                model=model
-            )
-            
-            self.session.add(new_result)
-            self.session.commit()
-        except Exception as e:
-            self.session.rollback()
-            logger.error(f"Error saving to database: {str(e)}")
-    
-    def _prepare_query_terms(self, query: str) -> list:
-        """Prepare query terms for matching by normalizing and splitting."""
-        # Split by spaces and convert to lowercase
-        query_lower = query.lower()
-        # Remove common punctuation from query
-        query_clean = re.sub(r'[^\w\s]', '', query_lower)
-        # Split into individual terms
-        return query_clean.split()
-    
-    def _normalize_text(self, text: str) -> str:
-        """Remove punctuation and convert text to lowercase for better matching."""
-        # Convert to lowercase and remove punctuation
-        text_lower = text.lower()
-        return re.sub(r'[^\w\s]', '', text_lower)
-
-    def _title_matches_query(self, normalized_title: str, query_terms: list) -> bool:
-        """Check if any query term is contained in the title."""
-        for term in query_terms:
-            if term and re.search(rf'\b{term}', normalized_title) or re.search(rf'{term}', normalized_title):
-                return True
-        return False
+        """Queue a sentiment result for a batched insert; duplicates are skipped by the unique index."""
+        self.writer.enqueue({
+            "query": query,
+            "category": category,
+            "title": title,
+            "sentiment": sentiment,
+            "source": source,
+            "model": model
+        })
     
-    def _analyze_sentiment(self, text: str, model: str) -> str:
-        """Basic sentiment analysis with caching."""
-        cache_key = f"{model}:{text.strip()}"
-        if cache_key in self.cache:
-            logger.info(f"Cache hit for sentiment: {cache_key}")
-            return self.cache[cache_key]
+    def _prefetch_explanations(self, results: List[Dict], model: str):
+        """Queue background explanations for the first results of a finished search."""
+        if EXPLANATION_PREFETCH_COUNT <= 0:
+            return
+        top = [result for result in results[:EXPLANATION_PREFETCH_COUNT]
+               if not result.get("explanation") and result.get("sentiment") in VALID_SENTIMENTS]
+        self.prefetcher.submit(self, top, model)
+
+    def _sentiment_key(self, text: str, model: str) -> Tuple:
+        """Single-flight key for classifying a text with a model and the current prompt."""
+        return ("sentiment", model, PROMPT_VERSION, text.strip())
+
+    def _claim_labels(
+        self,
+        texts: List[str],
+        indices: List[int],
+        model: str
+    ) -> Tuple[List[Tuple[int, Future]], List[Tuple[int, Future]]]:
+        """Split uncached texts into ones this caller classifies and ones already in flight elsewhere."""
+        owned, waiting = [], []
+        for index in indices:
+            future, leader = self.inflight.claim(self._sentiment_key(texts[index], model))
+            (owned if leader else waiting).append((index, future))
+        return owned, waiting
+
+    def _release_labels(
+        self,
+        texts: List[str],
+        owned: List[Tuple[int, Future]],
+        results: List[Optional[str]],
+        model: str,
+        error: Optional[BaseException] = None
+    ):
+        """Publish this caller's labels to any waiters; unfinished ones get the error instead."""
+        if error is not None and not isinstance(error, Exception):
+            # Cancelled tasks and closed generators should not tear down the waiters
+            error = SearchCancelled()
+        for index, future in owned:
+            key = self._sentiment_key(texts[index], model)
+            if results[index] is not None:
+                self.inflight.complete(key, future, results[index])
+            else:
+                self.inflight.complete(key, future, error=error or SearchCancelled())
+
+    def _wait_for_label(
+        self,
+        future: Future,
+        text: str,
+        model: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> str:
+        """Wait for another caller's classification, classifying here if that caller was cancelled."""
+        try:
+            return future.result()
+        except SearchCancelled:
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            sentiment = self._request_sentiment(text, model, cancel_token)
+            self.cache.set("sentiment", f"{model}:{text.strip()}", sentiment)
+            return sentiment
+
+    async def _wait_for_label_async(self, future: Future, text: str, model: str) -> str:
+        """Async counterpart of _wait_for_label."""
+        try:
+            return await asyncio.wrap_future(future)
+        except SearchCancelled:
+            sentiment = await self._request_sentiment_async(text, model)
+            self.cache.set("sentiment", f"{model}:{text.strip()}", sentiment)
+            return sentiment
 
-        payload = {
+    def _request_sentiment(self, text: str, model: str, cancel_token: Optional[CancellationToken] = None) -> str:
+        """Classify a single text with Ollama, bypassing every cache."""
+        return self._call_ollama(self._sentiment_payload(text, model), basic=True, cancel_token=cancel_token)
+
+    def _sentiment_payload(self, text: str, model: str) -> dict:
+        """Build the single-text classification request."""
+        return {
             "model": model,
             "messages": [
                 {
@@ -151,88 +270,553 @@ class BaseSentimentAnalyzer:
                 }
             ],
             "stream": False,
+            "options": self._label_options(model),
         }
 
-        sentiment = self._call_ollama(payload, basic=True)
-        self.cache[cache_key] = sentiment
-        return sentiment
+    def _label_options(self, model: str) -> dict:
+        """Generation limits for a one-word label reply."""
+        reasoning_prefixes = [prefix.strip() for prefix in OLLAMA_REASONING_MODELS.split(",") if prefix.strip()]
+        if any(model.startswith(prefix) for prefix in reasoning_prefixes):
+            return {"num_predict": OLLAMA_REASONING_NUM_PREDICT}
+        return {"num_predict": OLLAMA_LABEL_NUM_PREDICT, "stop": LABEL_STOP_SEQUENCES}
+
+    def _parse_sentiment(self, content: str) -> str:
+        """Extract the first word of a reply (after any reasoning) and ensure it's a valid sentiment."""
+        words = (_visible_reply(content) or "").split()
+        sentiment = words[0].lower().rstrip('.,!?;:') if words else ""
+        return sentiment if sentiment in VALID_SENTIMENTS else "unknown"
+
+    def _get_model_concurrency(self, model: str) -> int:
+        """Return the maximum number of concurrent classification calls for a model."""
+        return self.model_concurrency.get(model, max(1, OLLAMA_MAX_CONCURRENCY))
+
+    def _title_batches(self, count: int) -> List[List[int]]:
+        """Split title indices into prompt-sized batches."""
+        batch_size = max(1, OLLAMA_BATCH_SIZE)
+        return [list(range(start, min(start + batch_size, count))) for start in range(0, count, batch_size)]
+
+    def _classify_titles(
+        self,
+        titles: List[str],
+        model: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> Generator[Tuple[int, str], None, None]:
+        """Classify titles concurrently in prompt batches, yielding (index, sentiment) as each batch finishes.
+
+        Cancelling the token (or closing the generator) drops batches that have not started yet.
+        """
+        if not titles:
+            return
+
+        batches = self._title_batches(len(titles))
+
+        def classify(indices: List[int]) -> Optional[List[str]]:
+            if cancel_token is not None and cancel_token.cancelled:
+                return None
+            try:
+                return self._analyze_sentiment_batch([titles[i] for i in indices], model, cancel_token)
+            except SearchCancelled:
+                return None
+            except Exception as e:
+                logger.error(f"Sentiment analysis error: {e}")
+                return ["unknown"] * len(indices)
+
+        max_workers = min(self._get_model_concurrency(model), len(batches))
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            # Workers inherit the search's priority and tenant for the scheduler
+            futures = {
+                executor.submit(contextvars.copy_context().run, classify, indices): indices
+                for indices in batches
+            }
+            _track_foreground(len(futures))
+            for future in futures:
+                future.add_done_callback(lambda _: _track_foreground(-1))
+            for future in as_completed(futures):
+                labels = future.result()
+                if labels is None or (cancel_token is not None and cancel_token.cancelled):
+                    logger.info("Classification cancelled, dropping remaining batches")
+                    return
+                for index, sentiment in zip(futures[future], labels):
+                    yield index, sentiment
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _classify_titles_async(self, titles: List[str], model: str) -> AsyncGenerator[Tuple[int, str], None]:
+        """Async counterpart of _classify_titles; closing the generator cancels outstanding batches."""
+        if not titles:
+            return
+
+        async def classify(indices: List[int]):
+            try:
+                return indices, await self._analyze_sentiment_batch_async([titles[i] for i in indices], model)
+            except Exception as e:
+                logger.error(f"Sentiment analysis error: {e}")
+                return indices, ["unknown"] * len(indices)
+
+        tasks = [asyncio.ensure_future(classify(indices)) for indices in self._title_batches(len(titles))]
+        _track_foreground(len(tasks))
+        for task in tasks:
+            task.add_done_callback(lambda _: _track_foreground(-1))
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indices, labels = await next_done
+                for index, sentiment in zip(indices, labels):
+                    yield index, sentiment
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _lookup_cached_labels(self, texts: List[str], model: str) -> Tuple[List[Optional[str]], List[int]]:
+        """Fill labels from the memory and persistent caches, returning them with the indices still missing."""
+        results = [None] * len(texts)
+        uncached = []
+        for index, text in enumerate(texts):
+            cached = self.cache.get("sentiment", f"{model}:{text.strip()}")
+            if cached is not None:
+                results[index] = cached
+            else:
+                uncached.append(index)
+
+        # Read through the persistent cache in one bulk lookup
+        if uncached and self.persistent_cache:
+            stored = self.persistent_cache.get_many([texts[i] for i in uncached], model, PROMPT_VERSION)
+            still_uncached = []
+            for index in uncached:
+                label = stored.get(normalize_title(texts[index]))
+                if label:
+                    results[index] = label
+                    self.cache.set("sentiment", f"{model}:{texts[index].strip()}", label)
+                else:
+                    still_uncached.append(index)
+            uncached = still_uncached
+
+        return results, uncached
+
+    def _record_label(self, text: str, label: str, model: str, new_labels: List[Tuple[str, str]]):
+        """Cache a freshly classified label and queue it for the persistent cache if valid."""
+        self.cache.set("sentiment", f"{model}:{text.strip()}", label)
+        if label in VALID_SENTIMENTS:
+            new_labels.append((text, label))
+
+    def _analyze_sentiment_batch(
+        self,
+        texts: List[str],
+        model: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> List[str]:
+        """Classify several texts with one prompt, falling back to per-text calls for missing labels.
+
+        Texts another caller is already classifying are awaited rather than sent again.
+        """
+        results, uncached = self._lookup_cached_labels(texts, model)
+        owned, waiting = self._claim_labels(texts, uncached, model)
+        owned_indices = [index for index, _ in owned]
+
+        new_labels = []
+        try:
+            if len(owned_indices) > 1:
+                labels = self._request_batch_labels([texts[i] for i in owned_indices], model, cancel_token)
+                for index, label in zip(owned_indices, labels):
+                    if label:
+                        results[index] = label
+                        self._record_label(texts[index], label, model, new_labels)
+
+            for index in owned_indices:
+                if results[index] is None:
+                    if len(owned_indices) > 1:
+                        logger.info(f"Batch label missing, falling back to single call for: '{texts[index]}'")
+                    results[index] = self._request_sentiment(texts[index], model, cancel_token)
+                    self._record_label(texts[index], results[index], model, new_labels)
+        except BaseException as e:
+            self._release_labels(texts, owned, results, model, error=e)
+            raise
+        self._release_labels(texts, owned, results, model)
+
+        # Fill the persistent cache with every new label in one insert
+        if new_labels and self.persistent_cache:
+            self.persistent_cache.set_many(new_labels, model, PROMPT_VERSION)
 
-    def _analyze_sentiment_with_explanation(self, text: str, model: str) -> Tuple[str, str]:
-        """Analyze sentiment and provide explanation for the result."""
-        cache_key = f"{model}:{text.strip()}_with_explanation"
-        if cache_key in self.cache:
+        # Resolve waiters only after publishing our own labels so callers never wait on each other
+        for index, future in waiting:
+            results[index] = self._wait_for_label(future, texts[index], model, cancel_token)
+
+        return results
+
+    async def _analyze_sentiment_batch_async(self, texts: List[str], model: str) -> List[str]:
+        """Async counterpart of _analyze_sentiment_batch; database lookups run in a worker thread."""
+        results, uncached = await asyncio.to_thread(self._lookup_cached_labels, texts, model)
+        owned, waiting = self._claim_labels(texts, uncached, model)
+        owned_indices = [index for index, _ in owned]
+
+        new_labels = []
+        try:
+            if len(owned_indices) > 1:
+                labels = await self._request_batch_labels_async([texts[i] for i in owned_indices], model)
+                for index, label in zip(owned_indices, labels):
+                    if label:
+                        results[index] = label
+                        self._record_label(texts[index], label, model, new_labels)
+
+            for index in owned_indices:
+                if results[index] is None:
+                    if len(owned_indices) > 1:
+                        logger.info(f"Batch label missing, falling back to single call for: '{texts[index]}'")
+                    results[index] = await self._request_sentiment_async(texts[index], model)
+                    self._record_label(texts[index], results[index], model, new_labels)
+        except BaseException as e:
+            self._release_labels(texts, owned, results, model, error=e)
+            raise
+        self._release_labels(texts, owned, results, model)
+
+        if new_labels and self.persistent_cache:
+            await asyncio.to_thread(self.persistent_cache.set_many, new_labels, model, PROMPT_VERSION)
+
+        for index, future in waiting:
+            results[index] = await self._wait_for_label_async(future, texts[index], model)
+
+        return results
+
+    def _request_batch_labels(
+        self,
+        texts: List[str],
+        model: str,
+        cancel_token: Optional[CancellationToken] = None
+    ) -> List[str]:
+        """Ask Ollama for a JSON array of labels, returning None for any missing or malformed entry."""
+        parsed = self._call_ollama_json(self._batch_payload(texts, model), cancel_token)
+        return self._parse_batch_labels(parsed, len(texts))
+
+    async def _request_batch_labels_async(self, texts: List[str], model: str) -> List[str]:
+        """Async counterpart of _request_batch_labels."""
+        content = await self._post_ollama_async(self._batch_payload(texts, model))
+        try:
+            parsed = json.loads(content) if content is not None else None
+        except json.JSONDecodeError:
+            logger.warning("Ollama returned malformed JSON")
+            parsed = None
+        return self._parse_batch_labels(parsed, len(texts))
+
+    async def _request_sentiment_async(self, text: str, model: str) -> str:
+        """Async counterpart of _request_sentiment."""
+        stop_when = _label_complete if OLLAMA_STREAM_LABELS else None
+        content = await self._post_ollama_async(self._sentiment_payload(text, model), stop_when)
+        return self._parse_sentiment(content) if content is not None else "error"
+
+    def _batch_payload(self, texts: List[str], model: str) -> dict:
+        """Build the multi-text classification request."""
+        numbered = "\n".join(f"{i}. {text}" for i, text in enumerate(texts, start=1))
+        return {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Perform sentiment analysis on each numbered text. Respond ONLY with JSON of the form "
+                               "{\"sentiments\": [...]} containing one of 'positive', 'negative', or 'neutral' per text, in order."
+                },
+                {
+                    "role": "user",
+                    "content": f"Texts:\n{numbered}\nRespond with exactly {len(texts)} labels."
+                }
+            ],
+            "format": "json",
+            "stream": False,
+        }
+
+    def _parse_batch_labels(self, parsed, count: int) -> List[Optional[str]]:
+        """Validate a parsed batch reply, returning None for any missing or malformed label."""
+        labels = parsed.get("sentiments") if isinstance(parsed, dict) else parsed
+        if not isinstance(labels, list) or len(labels) != count:
+            logger.warning(f"Batch response did not contain {count} labels, falling back to single calls")
+            return [None] * count
+
+        validated = []
+        for label in labels:
+            label = label.strip().lower().rstrip('.,!?;:') if isinstance(label, str) else None
+            validated.append(label if label in VALID_SENTIMENTS else None)
+        return validated
+
+    def _explain_sentiment(self, text: str, model: str) -> Dict:
+        """Return the sentiment, explanation and confidence (or None) for a text, generated with one Ollama call."""
+        cache_key = f"{model}:{text.strip()}"
+        cached = self.cache.get("explanation", cache_key)
+        if cached is not None:
             logger.info(f"Cache hit for explanation: {cache_key}")
-            return self.cache[cache_key]
+            return cached
 
-        sentiment = self._analyze_sentiment(text, model)
-        
-        explanation_payload = {
+        # Simultaneous clicks on the same title share one explanation request
+        key = ("explanation", model, text.strip())
+        with scheduling(priority=PRIORITY_EXPLANATION):
+            future, leader = self.inflight.claim(key)
+            if not leader:
+                # A click joining a background prefetch makes it as urgent as the click
+                self.scheduler.promote(key)
+                return future.result()
+
+            try:
+                with self.scheduler.shared(key):
+                    explained = self._request_explanation(text, model)
+            except BaseException as e:
+                self.inflight.complete(key, future, error=e)
+                raise
+            self.inflight.complete(key, future, explained)
+            return explained
+
+    def _known_label(self, text: str, model: str) -> Optional[str]:
+        """Return an already classified label for a text without calling Ollama."""
+        cached = self.cache.get("sentiment", f"{model}:{text.strip()}")
+        if cached in VALID_SENTIMENTS:
+            return cached
+        if self.persistent_cache:
+            return self.persistent_cache.get(text, model, PROMPT_VERSION)
+        return None
+
+    def _request_explanation(self, text: str, model: str) -> Dict:
+        """Classify and explain a text in one structured call, caching the label and the explanation."""
+        cache_key = f"{model}:{text.strip()}"
+
+        # Keep the explanation consistent with the label already shown for this title
+        known_label = self._known_label(text, model)
+
+        parsed = self._call_ollama_json(self._explanation_payload(text, model, known_label))
+        explained = self._parse_explanation(parsed, known_label)
+        if explained is None:
+            # The model ignored the JSON format; read "label + explanation" from a plain reply instead
+            logger.warning("Structured explanation unusable, falling back to a plain reply")
+            sentiment, explanation = self._call_ollama(self._plain_explanation_payload(text, model, known_label))
+            if sentiment == "error":
+                return {
+                    "sentiment": known_label or "error",
+                    "explanation": f"Unable to generate explanation: {explanation}",
+                    "confidence": None
+                }
+            explained = {"sentiment": known_label or sentiment, "explanation": explanation, "confidence": None}
+
+        if explained["sentiment"] in VALID_SENTIMENTS:
+            if known_label is None:
+                # The explanation call doubles as the title's classification
+                self.cache.set("sentiment", cache_key, explained["sentiment"])
+                if self.persistent_cache:
+                    self.persistent_cache.set(text, explained["sentiment"], model, PROMPT_VERSION)
+            self.cache.set("explanation", cache_key, explained)
+        return explained
+
+    def _explanation_payload(self, text: str, model: str, known_label: Optional[str]) -> dict:
+        """Build the structured label-plus-explanation request."""
+        if known_label:
+            task = (f"The sentiment of the text has been determined to be '{known_label}'. "
+                    f"Explain in one concise sentence why it is '{known_label}'.")
+        else:
+            task = ("Classify the sentiment of the text as 'positive', 'negative', or 'neutral' "
+                    "and explain the label in one concise sentence.")
+        return {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": f"You are performing sentiment analysis. {task} Respond ONLY with JSON of the form "
+                               "{\"sentiment\": \"...\", \"explanation\": \"...\", \"confidence\": 0.0-1.0}."
+                },
+                {
+                    "role": "user",
+                    "content": f"Text: '{text}'"
+                }
+            ],
+            "format": "json",
+            "stream": False,
+        }
+
+    def _plain_explanation_payload(self, text: str, model: str, known_label: Optional[str]) -> dict:
+        """Build a plain-text request whose first word is the label, for models that ignore JSON mode."""
+        label_hint = f" The sentiment is '{known_label}'." if known_label else ""
+        return {
             "model": model,
             "messages": [
                 {
                     "role": "system",
-                    "content": f"You are performing sentiment analysis. The sentiment of the following text has been determined to be '{sentiment}'. "
-                            f"Please explain why you assigned the sentiment to be '{sentiment}' in one concise sentence."
+                    "content": f"Perform sentiment analysis.{label_hint} Start your reply with one word: positive, "
+                               "negative, or neutral, followed by one concise sentence explaining why."
                 },
                 {
                     "role": "user",
-                    "content": f"Text: '{text}'\nExplain why this is {sentiment}:"
+                    "content": f"Text: '{text}'"
                 }
             ],
             "stream": False,
         }
 
+    def _parse_explanation(self, parsed, known_label: Optional[str]) -> Optional[Dict]:
+        """Validate a structured explanation reply, returning None if it is unusable."""
+        if not isinstance(parsed, dict):
+            return None
+
+        sentiment = parsed.get("sentiment")
+        sentiment = sentiment.strip().lower().rstrip('.,!?;:') if isinstance(sentiment, str) else None
+        explanation = parsed.get("explanation")
+        if not isinstance(explanation, str) or not explanation.strip():
+            return None
+        if known_label:
+            sentiment = known_label
+        elif sentiment not in VALID_SENTIMENTS:
+            return None
+
         try:
-            response = requests.post(
-                OLLAMA_API_URL,
-                json=explanation_payload,
-                timeout=self.timeout
-            )
-
-            if response.status_code == 200:
-                explanation = response.json().get("message", {}).get("content", "").strip()
-                self.cache[cache_key] = (sentiment, explanation)
-                return sentiment, explanation
-            else:
-                return sentiment, f"Unable to generate explanation: {response.text}"
+            confidence = min(max(float(parsed.get("confidence")), 0.0), 1.0)
+        except (TypeError, ValueError):
+            confidence = None
 
+        return {"sentiment": sentiment, "explanation": explanation.strip(), "confidence": confidence}
+
+    async def _post_ollama_async(
+        self,
+        payload: dict,
+        stop_when: Optional[Callable[[str], bool]] = None
+    ) -> Optional[str]:
+        """Send a chat request to Ollama without blocking the event loop, returning the reply text or None."""
+        payload = dict(payload, keep_alive=OLLAMA_KEEP_ALIVE)
+        try:
+            async with self.scheduler.async_slot(payload["model"]):
+                if stop_when is not None:
+                    return await self._stream_ollama_async(payload, stop_when)
+                response = await async_request("ollama", "POST", OLLAMA_API_URL, json=payload)
+            if response.status_code != 200:
+                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                return None
+            return response.json().get("message", {}).get("content", "").strip()
         except Exception as e:
-            return sentiment, f"Explanation error: {str(e)}"
+            logger.error(f"Ollama connection error: {str(e)}")
+            return None
+
+    async def _stream_ollama_async(self, payload: dict, stop_when: Callable[[str], bool]) -> Optional[str]:
+        """Stream a reply with the async client, hanging up once stop_when accepts the text so far."""
+        parts = []
+        async with get_async_client("ollama").stream("POST", OLLAMA_API_URL, json=dict(payload, stream=True)) as response:
+            if response.status_code != 200:
+                await response.aread()
+                logger.error(f"Ollama API error: {response.status_code} - {response.text}")
+                return None
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done") or stop_when("".join(parts)):
+                    break
+        return "".join(parts).strip()
+
+    def _post_ollama(
+        self,
+        payload: dict,
+        cancel_token: Optional[CancellationToken] = None,
+        stop_when: Optional[Callable[[str], bool]] = None
+    ) -> Tuple[int, str]:
+        """Send a chat request to Ollama, returning (status code, reply text or error body).
+
+        With a cancel token or stop_when the reply is streamed: cancelling closes the connection so
+        Ollama stops generating a reply nobody will read, and so does stop_when(reply so far)
+        returning True once the caller has what it needs.
+        """
+        # Keep the model loaded between searches instead of Ollama's default five minutes
+        payload = dict(payload, keep_alive=OLLAMA_KEEP_ALIVE)
+        with self.scheduler.slot(payload["model"], cancel_token):
+            return self._send_ollama(payload, cancel_token, stop_when)
+
+    def _send_ollama(
+        self,
+        payload: dict,
+        cancel_token: Optional[CancellationToken],
+        stop_when: Optional[Callable[[str], bool]]
+    ) -> Tuple[int, str]:
+        """Perform the HTTP exchange for _post_ollama once a scheduler slot is held."""
+        if cancel_token is None and stop_when is None:
+            response = self.http.post(OLLAMA_API_URL, json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                return response.status_code, response.text
+            return 200, response.json().get("message", {}).get("content", "").strip()
+
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        response = self.http.post(OLLAMA_API_URL, json=dict(payload, stream=True), timeout=self.timeout, stream=True)
+        unregister = cancel_token.add_callback(response.close) if cancel_token is not None else None
+        try:
+            if response.status_code != 200:
+                return response.status_code, response.text
+
+            parts = []
+            for line in response.iter_lines():
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                parts.append(chunk.get("message", {}).get("content", ""))
+                # Leaving early closes the connection below, which aborts the rest of the generation
+                if chunk.get("done") or (stop_when is not None and stop_when("".join(parts))):
+                    break
+            return 200, "".join(parts).strip()
+        except SearchCancelled:
+            raise
+        except Exception:
+            # Closing the response from another thread surfaces as a read error here
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            raise
+        finally:
+            if unregister:
+                unregister()
+            response.close()
 
-    def _call_ollama(self, payload: dict, basic: bool = False):
+    def _call_ollama_json(self, payload: dict, cancel_token: Optional[CancellationToken] = None):
+        """Call Ollama and parse the reply as JSON, returning None on any failure."""
+        try:
+            status_code, content = self._post_ollama(payload, cancel_token)
+
+            if status_code != 200:
+                logger.error(f"Ollama API error: {status_code} - {content}")
+                return None
+
+            return json.loads(content)
+        except SearchCancelled:
+            raise
+        except json.JSONDecodeError:
+            logger.warning("Ollama returned malformed JSON")
+            return None
+        except requests.exceptions.Timeout:
+            logger.error("Ollama request timed out")
+            return None
+        except Exception as e:
+            logger.error(f"Ollama connection error: {str(e)}")
+            return None
+
+    def _call_ollama(self, payload: dict, basic: bool = False, cancel_token: Optional[CancellationToken] = None):
         """Generic Ollama API caller with improved error handling."""
         try:
-            # Send the request to Ollama API
-            response = requests.post(
-                OLLAMA_API_URL,
-                json=payload,
-                timeout=self.timeout
-            )
+            # Send the request to Ollama API; a bare label can be read before the model finishes talking
+            stop_when = _label_complete if basic and OLLAMA_STREAM_LABELS else None
+            status_code, content = self._post_ollama(payload, cancel_token, stop_when)
             
-            if response.status_code == 200:
-                content = response.json().get("message", {}).get("content", "").strip()
-
+            if status_code == 200:
                 if basic:
-                    # Extract the first word and ensure it's a valid sentiment
-                    sentiment = content.split()[0].lower().rstrip('.,!?;:')
-                    return sentiment if sentiment in ["positive", "negative", "neutral"] else "unknown"
+                    return self._parse_sentiment(content)
                 else:
                     # Split into sentiment and explanation
-                    parts = content.split(maxsplit=1)
+                    parts = (_visible_reply(content) or "").split(maxsplit=1)
                     if not parts:
                         return "unknown", "No analysis available"
                     
                     sentiment = parts[0].lower().rstrip('.,!?;:')
-                    if sentiment not in ["positive", "negative", "neutral"]:
+                    if sentiment not in VALID_SENTIMENTS:
                         sentiment = "unknown"
                     
                     explanation = parts[1] if len(parts) > 1 else "No explanation provided"
                     return sentiment, explanation
             else:
-                error_msg = f"Ollama API error: {response.status_code} - {response.text}"
+                error_msg = f"Ollama API error: {status_code} - {content}"
                 logger.error(error_msg)
                 return ("error", error_msg) if not basic else "error"
                 
+        except SearchCancelled:
+            raise
         except requests.exceptions.Timeout:
             error_msg = "Ollama request timed out"
             logger.error(error_msg)
@@ -240,4 +824,4 @@ class BaseSentimentAnalyzer:
         except Exception as e:
             error_msg = f"Ollama connection error: {str(e)}"
             logger.error(error_msg)
-            return ("error", error_msg) if not basic else "error"
\ No newline at end of file
+            return ("error", error_msg) if not basic else "error"
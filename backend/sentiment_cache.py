@@ -0,0 +1,122 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Cache configuration
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+ROUTE_CACHE_MAX_ENTRIES = int(os.getenv("ROUTE_CACHE_MAX_ENTRIES", "256"))
+
+# Time-to-live in seconds for each kind of cached value
+DEFAULT_TTLS = {
+    "sentiment": int(os.getenv("CACHE_TTL_SENTIMENT", str(24 * 3600))),      # "model:text" -> label
+    "explanation": int(os.getenv("CACHE_TTL_EXPLANATION", str(24 * 3600))),  # "model:text" -> {sentiment, explanation, confidence}
+    "news": int(os.getenv("CACHE_TTL_NEWS", "3600")),                        # "model:article_id" -> result dict
+    "video": int(os.getenv("CACHE_TTL_VIDEO", "3600")),                      # "model:video_id" -> result dict
+    "video_stats": int(os.getenv("CACHE_TTL_VIDEO_STATS", "900")),           # video_id -> view/like/comment counts
+    "combinations": int(os.getenv("CACHE_TTL_COMBINATIONS", "60")),           # valid query/source/model triples
+    "model_performance": int(os.getenv("CACHE_TTL_MODEL_PERFORMANCE", "30")), # filter key -> per-model feedback stats
+}
+
+COUNTER_NAMES = ("hits", "misses", "evictions", "expirations")
+
+
+class SentimentCache:
+    """Thread-safe LRU cache with per-namespace TTLs and hit/miss/eviction counters."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttls: Optional[Dict[str, int]] = None):
+        self.max_entries = max(1, max_entries)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self._entries = OrderedDict()  # (namespace, key) -> (expires_at, value)
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, counter: str, amount: int = 1):
+        """Increment a per-namespace counter. Caller must hold the lock."""
+        if namespace not in self._counters:
+            self._counters[namespace] = dict.fromkeys(COUNTER_NAMES, 0)
+        self._counters[namespace][counter] += amount
+
+    def get(self, namespace: str, key: Hashable, default: Any = None) -> Any:
+        """Return a cached value, or default if it is missing or expired."""
+        entry_key = (namespace, key)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None:
+                self._count(namespace, "misses")
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[entry_key]
+                self._count(namespace, "expirations")
+                self._count(namespace, "misses")
+                return default
+
+            self._entries.move_to_end(entry_key)
+            self._count(namespace, "hits")
+            return value
+
+    def set(self, namespace: str, key: Hashable, value: Any):
+        """Store a value, evicting the least recently used entries beyond the bound."""
+        ttl = self.ttls.get(namespace)
+        expires_at = time.monotonic() + ttl if ttl else None
+        entry_key = (namespace, key)
+        with self._lock:
+            self._entries[entry_key] = (expires_at, value)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                (evicted_namespace, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_namespace, "evictions")
+
+    def delete(self, namespace: str, key: Hashable):
+        """Remove a value if present."""
+        with self._lock:
+            self._entries.pop((namespace, key), None)
+
+    def clear_namespace(self, namespace: str):
+        """Remove every value in a namespace."""
+        with self._lock:
+            for entry_key in [k for k in self._entries if k[0] == namespace]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry counts and per-namespace counters."""
+        with self._lock:
+            sizes = {}
+            for namespace, _ in self._entries:
+                sizes[namespace] = sizes.get(namespace, 0) + 1
+            namespaces = {
+                namespace: dict(counters, entries=sizes.get(namespace, 0))
+                for namespace, counters in self._counters.items()
+            }
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "namespaces": namespaces,
+            }
+
+
+# Process-wide cache shared by every analyzer
+sentiment_cache = SentimentCache()
+
+# Small cache for dashboard queries, kept apart so a burst of searches cannot evict them
+route_cache = SentimentCache(max_entries=ROUTE_CACHE_MAX_ENTRIES)
@@ -0,0 +1,76 @@
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key onto one shared future.
+
+    Keys are tuples whose first element names the kind of call (e.g. "sentiment"),
+    which is also the namespace the counters are reported under.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key: Tuple, counter: str):
+        """Increment a per-namespace counter. Caller must hold the lock."""
+        counters = self._counters.setdefault(key[0], {"executed": 0, "coalesced": 0})
+        counters[counter] += 1
+
+    def claim(self, key: Tuple) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller must produce its result."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self._count(key, "coalesced")
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._count(key, "executed")
+            return future, True
+
+    def complete(self, key: Tuple, future: Future, result: Any = None, error: BaseException = None):
+        """Publish the leader's result (or error) to every waiter and retire the key."""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: Tuple, fn: Callable[[], Any]) -> Any:
+        """Run fn once for all concurrent callers with the same key and share its result."""
+        future, leader = self.claim(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self.complete(key, future, error=e)
+            raise
+        self.complete(key, future, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-namespace executed/coalesced counts and the share of calls saved."""
+        with self._lock:
+            namespaces = {}
+            for namespace, counters in self._counters.items():
+                total = counters["executed"] + counters["coalesced"]
+                namespaces[namespace] = dict(
+                    counters,
+                    coalesce_rate=round(counters["coalesced"] / total, 4) if total else 0.0,
+                )
+            return {"in_flight": len(self._calls), "namespaces": namespaces}
+
+
+# Process-wide coalescer shared by every analyzer
+single_flight = SingleFlight()
@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upstream response cache configuration
+UPSTREAM_CACHE_ENABLED = os.getenv("UPSTREAM_CACHE_ENABLED", "true").lower() == "true"
+UPSTREAM_CACHE_MAX_ENTRIES = int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "500"))
+UPSTREAM_CACHE_DIR = os.getenv("UPSTREAM_CACHE_DIR")  # Also keep responses on disk, e.g. /var/cache/sentiscope
+DISK_SWEEP_INTERVAL = 60  # Seconds between removals of expired cache files
+
+# Seconds a response is served as fresh, per upstream
+UPSTREAM_CACHE_TTLS = {
+    "newsapi": int(os.getenv("UPSTREAM_CACHE_TTL_NEWSAPI", "600")),
+    "youtube": int(os.getenv("UPSTREAM_CACHE_TTL_YOUTUBE", "900")),
+}
+# Seconds past its TTL a response is still served while a background request refreshes it
+UPSTREAM_CACHE_STALE_TTL = int(os.getenv("UPSTREAM_CACHE_STALE_TTL", "3600"))
+
+# Parameters that identify the caller rather than the request
+SECRET_PARAMS = ("apiKey", "key")
+
+# Quota units each endpoint costs, by upstream and the last path segment
+QUOTA_COSTS = {
+    "newsapi": {"everything": 1},
+    "youtube": {"search": 100, "videos": 1},
+}
+
+COUNTER_NAMES = ("hits", "stale_hits", "misses", "refreshes", "refresh_failures", "quota_saved")
+
+
+class CachedResponse:
+    """Stands in for a successful HTTP response served from the cache."""
+
+    status_code = 200
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def json(self):
+        # Parse on every call so callers never share (and mutate) one body
+        return json.loads(self.text)
+
+
+def cache_key(upstream: str, url: str, params: Dict) -> str:
+    """Identify a request by upstream, URL and its parameters, sorted, without API keys."""
+    normalized = sorted(
+        (name, " ".join(str(value).split()).lower() if name == "q" else str(value))
+        for name, value in params.items()
+        if name not in SECRET_PARAMS and value is not None
+    )
+    return json.dumps([upstream, url, normalized])
+
+
+class UpstreamCache:
+    """Caches successful NewsAPI and YouTube JSON responses with stale-while-revalidate.
+
+    Fresh entries are returned directly. Entries past their TTL but within the stale window
+    are returned too while one background request per key refreshes them. Only 200
+    responses are stored, so errors and rate limits are never cached.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, int]] = None, stale_ttl: int = UPSTREAM_CACHE_STALE_TTL,
+                 max_entries: int = UPSTREAM_CACHE_MAX_ENTRIES, cache_dir: Optional[str] = UPSTREAM_CACHE_DIR):
+        self.ttls = dict(UPSTREAM_CACHE_TTLS, **(ttls or {}))
+        self.stale_ttl = stale_ttl
+        self.max_entries = max(1, max_entries)
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self._entries = OrderedDict()  # key -> (stored_at, text)
+        self._refreshing = set()
+        self._tasks = set()
+        self._counters = {}
+        self._last_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def _count(self, upstream: str, counter: str, amount: int = 1):
+        """Increment a per-upstream counter. Caller must hold the lock."""
+        if upstream not in self._counters:
+            self._counters[upstream] = dict.fromkeys(COUNTER_NAMES, 0)
+        self._counters[upstream][counter] += amount
+
+    def _path(self, key: str) -> str:
+        """File holding a key's response on disk."""
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def _load(self, key: str) -> Optional[Tuple[float, str]]:
+        """Return a stored (stored_at, text) entry from memory, falling back to disk."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                stored = json.load(f)
+            entry = (stored["stored_at"], stored["text"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable upstream cache file: {str(e)}")
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: Tuple[float, str]):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store(self, key: str, response):
+        """Keep a successful response in memory and, if configured, on disk."""
+        if response.status_code != 200:
+            return
+        entry = (time.time(), response.text)
+        self._remember(key, entry)
+        if self.cache_dir:
+            try:
+                path = self._path(key)
+                with open(path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"stored_at": entry[0], "text": entry[1]}, f)
+                os.replace(path + ".tmp", path)
+            except Exception as e:
+                logger.warning(f"Could not write upstream cache file: {str(e)}")
+
+            now = time.monotonic()
+            with self._lock:
+                sweep = now - self._last_sweep >= DISK_SWEEP_INTERVAL
+                if sweep:
+                    self._last_sweep = now
+            if sweep:
+                self._sweep_disk()
+
+    def _sweep_disk(self):
+        """Delete cache files past every upstream's stale window, then the oldest beyond max_entries."""
+        expires_before = time.time() - (max(self.ttls.values(), default=0) + self.stale_ttl)
+        files = []
+        try:
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith((".json", ".json.tmp")):
+                    continue
+                try:
+                    modified = entry.stat().st_mtime
+                    if modified < expires_before:
+                        os.remove(entry.path)
+                    elif entry.name.endswith(".json"):
+                        files.append((modified, entry.path))
+                except FileNotFoundError:
+                    continue
+
+            files.sort()
+            for _, path in files[:max(0, len(files) - self.max_entries)]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        except Exception as e:
+            logger.warning(f"Could not sweep upstream cache directory: {str(e)}")
+
+    def _lookup(self, upstream: str, url: str, params: Dict) -> Tuple[str, Optional[CachedResponse], bool]:
+        """Return (key, cached response or None, whether the cached response needs refreshing) and count it."""
+        key = cache_key(upstream, url, params)
+        entry = self._load(key) if UPSTREAM_CACHE_ENABLED else None
+        age = time.time() - entry[0] if entry else None
+        ttl = self.ttls.get(upstream, 0)
+        cost = QUOTA_COSTS.get(upstream, {}).get(urlparse(url).path.rsplit("/", 1)[-1], 1)
+
+        with self._lock:
+            if entry is None or age > ttl + self.stale_ttl:
+                self._count(upstream, "misses")
+                return key, None, False
+            self._count(upstream, "quota_saved", cost)
+            if age <= ttl:
+                self._count(upstream, "hits")
+                return key, CachedResponse(entry[1]), False
+            self._count(upstream, "stale_hits")
+            # Only one refresh per key at a time
+            refresh = key not in self._refreshing
+            if refresh:
+                self._refreshing.add(key)
+            return key, CachedResponse(entry[1]), refresh
+
+    def _refreshed(self, upstream: str, key: str, response=None):
+        with self._lock:
+            self._refreshing.discard(key)
+            self._count(upstream, "refreshes" if response is not None and response.status_code == 200 else "refresh_failures")
+        if response is not None:
+            self._store(key, response)
+
+    def fetch(self, upstream: str, url: str, params: Dict, send: Callable[[], object]):
+        """Return a cached response for the request if there is one, else send() it and cache the result."""
+        key, cached, refresh = self._lookup(upstream, url, params)
+        if cached is None:
+            response = send()
+            self._store(key, response)
+            return response
+
+        if refresh:
+            def revalidate():
+                try:
+                    self._refreshed(upstream, key, send())
+                except Exception as e:
+                    logger.warning(f"Background {upstream} refresh failed: {str(e)}")
+                    self._refreshed(upstream, key)
+
+            threading.Thread(target=revalidate, name="upstream-refresh", daemon=True).start()
+        return cached
+
+    async def fetch_async(self, upstream: str, url: str, params: Dict, send: Callable[[], Awaitable]):
+        """Async counterpart of fetch; refreshes run as tasks on the current event loop."""
+        key, cached, refresh = self._lookup(upstream, url, params)
+        if cached is None:
+            response = await send()
+            self._store(key, response)
+            return response
+
+        if refresh:
+            async def revalidate():
+                try:
+                    self._refreshed(upstream, key, await send())
+                except Exception as e:
+                    logger.warning(f"Background {upstream} refresh failed: {str(e)}")
+                    self._refreshed(upstream, key)
+
+            # Hold a reference so the task is not garbage collected mid-flight
+            task = asyncio.ensure_future(revalidate())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return cached
+
+    def stats(self) -> Dict:
+        """Return per-upstream counters, including quota units saved, and the entry count."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "upstreams": {upstream: dict(counters) for upstream, counters in self._counters.items()},
+            }
+
+
+# Process-wide cache shared by every analyzer
+upstream_cache = UpstreamCache()
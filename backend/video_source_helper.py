@@ -1,45 +1,37 @@
+import asyncio
 import requests
 import json
-from typing import Dict, Generator, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Tuple
 import logging
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 from sentiment_analyzer import BaseSentimentAnalyzer
+from http_client import async_request, get_session, get_timeout
+from cancellation import CancellationToken
+from query_matcher import QueryMatcher
+from upstream_cache import upstream_cache
 
 load_dotenv()
 
 # API Configuration
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 YOUTUBE_API_URL = "https://www.googleapis.com/youtube/v3"
+YOUTUBE_MAX_RESULTS = 50  # Most search results per page and ids per videos.list call the API allows
+
+# Each search page costs 100 quota units, so paging for more matches is capped
+YOUTUBE_MAX_PAGES = int(os.getenv("YOUTUBE_MAX_PAGES", "3"))
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class YouTubeSentimentAnalyzer(BaseSentimentAnalyzer):
-    def __init__(self):
-        super().__init__()
-        self.cache_expiry = timedelta(hours=1)  # Cache expiration time
-    
-    def _get_from_cache(self, video_id: str, model: str):
-        """Get result from cache if it exists, is valid, and matches the current model."""
-        if video_id in self.cache:
-            cache_entry = self.cache[video_id]
-            if isinstance(cache_entry, dict) and 'timestamp' in cache_entry:
-                if (datetime.now() - cache_entry['timestamp'] < self.cache_expiry and 
-                    cache_entry['data'].get('model') == model):
-                    return cache_entry['data']
-                del self.cache[video_id]
-        return None
-
-    def _add_to_cache(self, video_id: str, result: Dict, model: str):
-        """Store result in cache with timestamp for expiration tracking."""
-        result['model'] = model  # Store model with cached result
-        self.cache[video_id] = {
-            'data': result,
-            'timestamp': datetime.now()
-        }
+    result_namespace = "video"
+
+    def __init__(self, engine=None):
+        super().__init__(engine)
 
     def get_video_results(
         self,
@@ -51,128 +43,67 @@ class YouTubeSentimentAnalyzer(BaseSentimentAnalyzer):
         channel: Optional[str] = None,
         category: str = "online videos",
         model: str = "gemma3:1b",
-        max_days_old: Optional[int] = 30
+        max_days_old: Optional[int] = 30,
+        cancel_token: Optional[CancellationToken] = None
     ) -> Generator[Dict, None, None]:
-        """Fetch recent videos from YouTube API with query in title."""
-        try:
-            # Prepare API request parameters
-            params = {
-                "part": "snippet",
-                "q": query,
-                "type": "video",
-                "maxResults": min(num_videos * 3, 50),  # Get extra for filtering
-                "key": YOUTUBE_API_KEY,
-                "regionCode": country,
-                "order": "date",  # Most recent first
-                "relevanceLanguage": "en"
-            }
-
-            if channel:
-                params["channelId"] = channel
-            
-            if max_days_old:
-                published_after = (datetime.now() - timedelta(days=max_days_old)).isoformat() + "Z"
-                params["publishedAfter"] = published_after
+        """Fetch recent videos from YouTube API with query in title.
 
+        Statistics for each page's videos and, while matches are short of num_videos, the next
+        search page are fetched in the background while the page's titles are classified.
+        """
+        fetcher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="youtube-fetch")
+        try:
             logger.info(f"Fetching YouTube videos for: '{query}'")
-            response = requests.get(
-                f"{YOUTUBE_API_URL}/search",
-                params=params,
-                timeout=15
+            params = self._search_params(query, num_videos, country, channel, max_days_old)
+            response = upstream_cache.fetch(
+                "youtube", f"{YOUTUBE_API_URL}/search", params,
+                lambda: get_session("youtube").get(f"{YOUTUBE_API_URL}/search", params=params, timeout=get_timeout("youtube"))
             )
 
-            # Handle API response
-            if response.status_code != 200:
-                error = response.json().get('error', {})
-                logger.error(f"YouTube API error: {error.get('code', '')} - {error.get('message', 'Unknown error')}")
-                yield {"error": f"YouTube API error: {error.get('message', 'Please try again later')}"}
-                return
-
-            search_results = response.json()
-            items = search_results.get("items", [])
-            
-            if not items:
-                logger.warning(f"No videos found for query: '{query}'")
-                yield {
-                    "error": f"No recent videos found for '{query}'. Try different keywords or news sources."
-                }
+            error, items, page_token = self._search_items(response, query)
+            if error:
+                yield error
                 return
 
-            # Validate and filter items
-            valid_items = []
-            for item in items:
-                if not isinstance(item, dict):
-                    continue
-                if not item.get("id", {}).get("videoId"):
-                    continue
-                if not item.get("snippet"):
-                    continue
-                valid_items.append(item)
-
-            if not valid_items:
-                logger.error("No valid video items in API response")
-                yield {
-                    "error": f"Found videos for '{query}' but couldn't process them. Please try again."
-                }
-                return
+            seen_ids = set()
+            cached_results = []
+            completed = []
+            page = 1
+            while True:
+                page_cached, pending_items = self._select_videos(
+                    self._unseen_videos(items, seen_ids), query,
+                    num_videos - len(cached_results) - len(completed), category, model
+                )
+                included = len(cached_results) + len(completed) + len(page_cached) + len(pending_items)
+                next_page = None
+                if included < num_videos and page_token and page < YOUTUBE_MAX_PAGES:
+                    next_page = fetcher.submit(self._fetch_search_page, params, page_token, query)
+                video_details = fetcher.submit(self._get_video_details, [item["id"]["videoId"] for item in pending_items])
 
-            # Get additional video details
-            video_ids = [item["id"]["videoId"] for item in valid_items]
-            video_details = self._get_video_details(video_ids)
+                cached_results.extend(page_cached)
+                yield from page_cached
 
-            # Process videos
-            query_terms = self._prepare_query_terms(query)
-            included_count = 0
-            duplicate_count = 0
+                # Classify this page's queued titles together and stream each result as it completes
+                titles = [item["snippet"]["title"] for item in pending_items]
+                for index, sentiment in self._classify_titles(titles, model, cancel_token):
+                    completed.append(self._complete_video_result(
+                        pending_items[index], video_details.result(), sentiment, query, category, model
+                    ))
+                    yield completed[-1]
 
-            for item in valid_items:
-                if included_count >= num_videos:
+                if next_page is None or (cancel_token is not None and cancel_token.cancelled):
+                    break
+                items, page_token = next_page.result()
+                if not items:
                     break
+                page += 1
 
-                video_id = item["id"]["videoId"]
-                title = item["snippet"]["title"]
-                channel_name = item["snippet"]["channelTitle"]
-
-                # Skip if query not in title
-                if not self._title_matches_query(self._normalize_text(title), query_terms):
-                    continue
-
-                cached_result = self._get_from_cache(video_id, model)
-                if cached_result:
-                    if not self._is_duplicate_entry(title, channel_name, model):
-                        self._save_to_database(query, category, title, 
-                                               cached_result["sentiment"], channel_name, model)
-                        self._add_to_existing_entries(title, channel_name, model)
-                    yield cached_result
-                    included_count += 1
-                    continue
-
-                # Process new video
-                details = video_details.get(video_id, {})
-                sentiment = self._analyze_sentiment(title, model)
-                
-                result = self._create_video_result(
-                    item, 
-                    details, 
-                    sentiment, 
-                    None  # Explanation can be added later
-                )
-                
-                self._add_to_cache(video_id, result, model)
-                
-                if not self._is_duplicate_entry(title, channel_name, model):
-                    self._save_to_database(query, category, title, sentiment, channel_name, model)
-                    self._add_to_existing_entries(title, channel_name, model)
-                
-                yield result
-                included_count += 1
+            # Speculatively explain the first results shown, once classification is done
+            if cancel_token is None or not cancel_token.cancelled:
+                self._prefetch_explanations(cached_results + completed, model)
 
-            # Final logging
-            logger.info(f"Returned {included_count} videos for '{query}'")
-            if included_count == 0:
-                yield {
-                    "error": f"Found videos for '{query}' but none matched all filters. Try different search terms."
-                }
+            if not cached_results and not completed:
+                yield self._no_match_error(query)
 
         except requests.exceptions.RequestException as e:
             logger.error(f"YouTube API request failed: {str(e)}")
@@ -180,61 +111,347 @@ class YouTubeSentimentAnalyzer(BaseSentimentAnalyzer):
         except Exception as e:
             logger.error(f"Unexpected error in get_video_results: {str(e)}")
             yield {"error": f"An unexpected error occurred: {str(e)}"}
+        finally:
+            fetcher.shutdown(wait=False, cancel_futures=True)
 
-    def _get_video_details(self, video_ids: list) -> Dict:
-        """Get video statistics with improved error handling."""
-        if not video_ids:
-            logger.warning("No video IDs provided to _get_video_details")
-            return {}
-            
+    async def get_video_results_async(
+        self,
+        query: str,
+        platform: Optional[str] = "youtube",
+        num_videos: int = 10,
+        sort_by: str = "relevance",
+        country: Optional[str] = "us",
+        channel: Optional[str] = None,
+        category: str = "online videos",
+        model: str = "gemma3:1b",
+        max_days_old: Optional[int] = 30
+    ) -> AsyncGenerator[Dict, None]:
+        """Async counterpart of get_video_results for the ASGI search endpoint."""
+        background = []
         try:
-            # Validate video IDs format
-            valid_ids = [vid for vid in video_ids if isinstance(vid, str) and vid.strip()]
-            if len(valid_ids) != len(video_ids):
-                logger.warning(f"Filtered out {len(video_ids) - len(valid_ids)} invalid video IDs")
-            
-            if not valid_ids:
-                logger.error("No valid video IDs to process")
-                return {}
-                
-            # YouTube API allows up to 50 IDs per request
-            ids_str = ",".join(valid_ids[:50])
-            
-            params = {
-                "part": "statistics",
-                "id": ids_str,
-                "key": YOUTUBE_API_KEY
-            }
-            
-            response = requests.get(f"{YOUTUBE_API_URL}/videos", params=params, timeout=10)
-            
-            if response.status_code == 200:
-                details = {}
-                items = response.json().get("items", [])
-                
+            logger.info(f"Fetching YouTube videos asynchronously for: '{query}'")
+            params = self._search_params(query, num_videos, country, channel, max_days_old)
+            response = await upstream_cache.fetch_async(
+                "youtube", f"{YOUTUBE_API_URL}/search", params,
+                lambda: async_request("youtube", "GET", f"{YOUTUBE_API_URL}/search", params=params)
+            )
+
+            error, items, page_token = self._search_items(response, query)
+            if error:
+                yield error
+                return
+
+            seen_ids = set()
+            cached_results = []
+            completed = []
+            page = 1
+            while True:
+                page_cached, pending_items = self._select_videos(
+                    self._unseen_videos(items, seen_ids), query,
+                    num_videos - len(cached_results) - len(completed), category, model
+                )
+                included = len(cached_results) + len(completed) + len(page_cached) + len(pending_items)
+                next_page = None
+                if included < num_videos and page_token and page < YOUTUBE_MAX_PAGES:
+                    next_page = asyncio.ensure_future(self._fetch_search_page_async(params, page_token, query))
+                video_details = asyncio.ensure_future(
+                    self._get_video_details_async([item["id"]["videoId"] for item in pending_items])
+                )
+                background = [task for task in (next_page, video_details) if task is not None]
+
+                for result in page_cached:
+                    yield result
+                cached_results.extend(page_cached)
+
+                titles = [item["snippet"]["title"] for item in pending_items]
+                async for index, sentiment in self._classify_titles_async(titles, model):
+                    completed.append(self._complete_video_result(
+                        pending_items[index], await video_details, sentiment, query, category, model
+                    ))
+                    yield completed[-1]
+
+                if next_page is None:
+                    break
+                items, page_token = await next_page
                 if not items:
-                    logger.warning(f"No video details returned for IDs: {video_ids[:3]}...")
-                
-                for item in items:
-                    video_id = item["id"]
-                    statistics = item.get("statistics", {})
-                    details[video_id] = {
-                        "viewCount": statistics.get("viewCount", "0"),
-                        "likeCount": statistics.get("likeCount", "0"),
-                        "commentCount": statistics.get("commentCount", "0")
-                    }
-                    
-                # Log how many details were successfully retrieved
-                logger.info(f"Retrieved details for {len(details)} out of {len(video_ids)} requested videos")
-                return details
-            else:
-                logger.error(f"Failed to get video details: {response.status_code} - {response.text}")
-                return {}
-                
+                    break
+                page += 1
+            self._prefetch_explanations(cached_results + completed, model)
+
+            if not cached_results and not completed:
+                yield self._no_match_error(query)
+
         except Exception as e:
-            logger.error(f"Error in _get_video_details: {str(e)}")
+            logger.error(f"Unexpected error in get_video_results_async: {str(e)}")
+            yield {"error": f"An unexpected error occurred: {str(e)}"}
+        finally:
+            for task in background:
+                task.cancel()
+
+    def _search_params(
+        self,
+        query: str,
+        num_videos: int,
+        country: Optional[str],
+        channel: Optional[str],
+        max_days_old: Optional[int]
+    ) -> Dict:
+        """Build YouTube search request parameters."""
+        params = {
+            "part": "snippet",
+            "q": query,
+            "type": "video",
+            "maxResults": min(num_videos * 3, YOUTUBE_MAX_RESULTS),  # Get extra for filtering
+            "key": YOUTUBE_API_KEY,
+            "regionCode": country,
+            "order": "date",  # Most recent first
+            "relevanceLanguage": "en"
+        }
+
+        if channel:
+            params["channelId"] = channel
+
+        if max_days_old:
+            # Whole hours in UTC, so repeated searches share one upstream cache entry
+            published_after = datetime.utcnow() - timedelta(days=max_days_old)
+            params["publishedAfter"] = published_after.strftime("%Y-%m-%dT%H:00:00Z")
+
+        return {key: value for key, value in params.items() if value is not None}
+
+    def _search_items(self, response, query: str) -> Tuple[Optional[Dict], List[Dict], Optional[str]]:
+        """Validate a search response, returning (error, valid items, next page token).
+
+        error is an event dict when the response holds nothing that can be returned.
+        """
+        # Handle API response
+        if response.status_code != 200:
+            error = response.json().get('error', {})
+            logger.error(f"YouTube API error: {error.get('code', '')} - {error.get('message', 'Unknown error')}")
+            return {"error": f"YouTube API error: {error.get('message', 'Please try again later')}"}, [], None
+
+        data = response.json()
+        items = data.get("items", [])
+
+        if not items:
+            logger.warning(f"No videos found for query: '{query}'")
+            return {
+                "error": f"No recent videos found for '{query}'. Try different keywords or news sources."
+            }, [], None
+
+        # Validate and filter items
+        valid_items = []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            if not item.get("id", {}).get("videoId"):
+                continue
+            if not item.get("snippet"):
+                continue
+            valid_items.append(item)
+
+        if not valid_items:
+            logger.error("No valid video items in API response")
+            return {
+                "error": f"Found videos for '{query}' but couldn't process them. Please try again."
+            }, [], None
+
+        return None, valid_items, data.get("nextPageToken")
+
+    def _fetch_search_page(self, params: Dict, page_token: str, query: str) -> Tuple[List[Dict], Optional[str]]:
+        """Fetch a further search page, returning its valid items and the next token (empty on any failure)."""
+        try:
+            logger.info(f"Fetching next YouTube search page for: '{query}'")
+            page_params = dict(params, pageToken=page_token)
+            response = upstream_cache.fetch(
+                "youtube", f"{YOUTUBE_API_URL}/search", page_params,
+                lambda: get_session("youtube").get(f"{YOUTUBE_API_URL}/search", params=page_params, timeout=get_timeout("youtube"))
+            )
+            error, items, next_token = self._search_items(response, query)
+            return ([], None) if error else (items, next_token)
+        except Exception as e:
+            logger.error(f"YouTube search page failed: {str(e)}")
+            return [], None
+
+    async def _fetch_search_page_async(self, params: Dict, page_token: str, query: str) -> Tuple[List[Dict], Optional[str]]:
+        """Async counterpart of _fetch_search_page."""
+        try:
+            logger.info(f"Fetching next YouTube search page for: '{query}'")
+            page_params = dict(params, pageToken=page_token)
+            response = await upstream_cache.fetch_async(
+                "youtube", f"{YOUTUBE_API_URL}/search", page_params,
+                lambda: async_request("youtube", "GET", f"{YOUTUBE_API_URL}/search", params=page_params)
+            )
+            error, items, next_token = self._search_items(response, query)
+            return ([], None) if error else (items, next_token)
+        except Exception as e:
+            logger.error(f"YouTube search page failed: {str(e)}")
+            return [], None
+
+    def _unseen_videos(self, items: List[Dict], seen_ids: set) -> List[Dict]:
+        """Drop videos already returned on an earlier page."""
+        unseen = []
+        for item in items:
+            video_id = item["id"]["videoId"]
+            if video_id not in seen_ids:
+                seen_ids.add(video_id)
+                unseen.append(item)
+        return unseen
+
+    def _no_match_error(self, query: str) -> Dict:
+        """Event returned when no video title matched the query."""
+        return {"error": f"Found videos for '{query}' but none matched all filters. Try different search terms."}
+
+    def _select_videos(
+        self,
+        items: List[Dict],
+        query: str,
+        num_videos: int,
+        category: str,
+        model: str
+    ) -> Tuple[List[Dict], List[Dict]]:
+        """Split videos whose title matches the query into cached results and items to classify."""
+        title_matches = QueryMatcher(query).match_titles([item["snippet"].get("title") or "" for item in items])
+        cached_results = []
+        pending_items = []
+
+        for item, matched_terms in zip(items, title_matches):
+            if len(cached_results) + len(pending_items) >= num_videos:
+                break
+
+            video_id = item["id"]["videoId"]
+            title = item["snippet"]["title"]
+            channel_name = item["snippet"]["channelTitle"]
+
+            # Skip if query not in title
+            if not matched_terms:
+                continue
+
+            cached_result = self._get_cached_result(video_id, model)
+            if cached_result:
+                self._save_to_database(query, category, title,
+                                       cached_result["sentiment"], channel_name, model)
+                cached_results.append(cached_result)
+                continue
+
+            # Queue new video for batched sentiment analysis
+            pending_items.append(item)
+
+        logger.info(f"Returned {len(cached_results) + len(pending_items)} videos for '{query}'")
+        return cached_results, pending_items
+
+    def _complete_video_result(
+        self,
+        item: Dict,
+        video_details: Dict,
+        sentiment: str,
+        query: str,
+        category: str,
+        model: str
+    ) -> Dict:
+        """Build the result for a freshly classified video, then cache and save it."""
+        video_id = item["id"]["videoId"]
+        result = self._create_video_result(
+            item,
+            video_details.get(video_id, {}),
+            sentiment,
+            None  # Explanation can be added later
+        )
+
+        self._add_to_cache(video_id, result, model)
+
+        self._save_to_database(query, category, item["snippet"]["title"], sentiment, item["snippet"]["channelTitle"], model)
+        return result
+
+    def _valid_video_ids(self, video_ids: list) -> List[str]:
+        """Drop malformed ids."""
+        valid_ids = [vid for vid in video_ids if isinstance(vid, str) and vid.strip()]
+        if len(valid_ids) != len(video_ids):
+            logger.warning(f"Filtered out {len(video_ids) - len(valid_ids)} invalid video IDs")
+        return valid_ids
+
+    def _cached_video_details(self, video_ids: list) -> Tuple[Dict, List[List[str]]]:
+        """Return statistics already cached and the remaining valid ids in videos.list-sized chunks."""
+        details = {}
+        missing = []
+        for video_id in self._valid_video_ids(video_ids):
+            cached = self.cache.get("video_stats", video_id)
+            if cached is not None:
+                details[video_id] = cached
+            else:
+                missing.append(video_id)
+        chunks = [missing[start:start + YOUTUBE_MAX_RESULTS] for start in range(0, len(missing), YOUTUBE_MAX_RESULTS)]
+        return details, chunks
+
+    def _video_details_params(self, chunk: List[str]) -> Dict:
+        """Build videos.list parameters for one chunk of ids."""
+        return {
+            "part": "statistics",
+            "id": ",".join(chunk),
+            "key": YOUTUBE_API_KEY
+        }
+
+    def _parse_video_details(self, response, video_ids: list) -> Dict:
+        """Extract view, like and comment counts from a videos.list response and cache them."""
+        if response.status_code != 200:
+            logger.error(f"Failed to get video details: {response.status_code} - {response.text}")
+            return {}
+
+        details = {}
+        items = response.json().get("items", [])
+
+        if not items:
+            logger.warning(f"No video details returned for IDs: {video_ids[:3]}...")
+
+        for item in items:
+            video_id = item["id"]
+            statistics = item.get("statistics", {})
+            details[video_id] = {
+                "viewCount": statistics.get("viewCount", "0"),
+                "likeCount": statistics.get("likeCount", "0"),
+                "commentCount": statistics.get("commentCount", "0")
+            }
+            self.cache.set("video_stats", video_id, details[video_id])
+
+        # Log how many details were successfully retrieved
+        logger.info(f"Retrieved details for {len(details)} out of {len(video_ids)} requested videos")
+        return details
+
+    def _get_video_details(self, video_ids: list) -> Dict:
+        """Get video statistics, reusing cached counts and requesting the rest 50 ids at a time."""
+        if not video_ids:
             return {}
 
+        details, chunks = self._cached_video_details(video_ids)
+        for chunk in chunks:
+            try:
+                response = get_session("youtube").get(
+                    f"{YOUTUBE_API_URL}/videos", params=self._video_details_params(chunk), timeout=get_timeout("youtube")
+                )
+                details.update(self._parse_video_details(response, chunk))
+            except Exception as e:
+                logger.error(f"Error in _get_video_details: {str(e)}")
+        return details
+
+    async def _get_video_details_async(self, video_ids: list) -> Dict:
+        """Async counterpart of _get_video_details; chunks are requested concurrently."""
+        if not video_ids:
+            return {}
+
+        async def fetch(chunk: List[str]) -> Dict:
+            try:
+                response = await async_request(
+                    "youtube", "GET", f"{YOUTUBE_API_URL}/videos", params=self._video_details_params(chunk)
+                )
+                return self._parse_video_details(response, chunk)
+            except Exception as e:
+                logger.error(f"Error in _get_video_details_async: {str(e)}")
+                return {}
+
+        details, chunks = self._cached_video_details(video_ids)
+        for fetched in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            details.update(fetched)
+        return details
+
     def _create_video_result(self, item: Dict, details: Dict, sentiment: str, explanation: str) -> Dict:
         """Standardize video result format."""
         return {
@@ -262,28 +479,18 @@ class YouTubeSentimentAnalyzer(BaseSentimentAnalyzer):
         """Get detailed sentiment explanation for video titles."""
         try:
             # Check cache first
-            cached_result = self._get_from_cache(video_id, model)
+            cached_result = self._get_cached_result(video_id, model)
             if cached_result and cached_result.get("explanation"):
                 return cached_result["sentiment"], cached_result["explanation"]
                 
             # Get fresh analysis if not in cache
-            sentiment, explanation = self._analyze_sentiment_with_explanation(text, model)
+            explained = self._explain_sentiment(text, model)
             
             # Update cache if video exists
-            if video_id in self.cache:
-                if isinstance(self.cache[video_id], dict) and 'data' in self.cache[video_id]:
-                    self.cache[video_id]['data'].update({
-                        "sentiment": sentiment,
-                        "explanation": explanation
-                    })
-                else:
-                    # Handle the case where it's directly in cache
-                    self.cache[video_id].update({
-                        "sentiment": sentiment,
-                        "explanation": explanation
-                    })
+            if cached_result:
+                cached_result.update(explained)
             
-            return sentiment, explanation
+            return explained["sentiment"], explained["explanation"]
             
         except Exception as e:
             logger.error(f"Explanation error: {str(e)}")
@@ -66,7 +66,7 @@ done
 
 # Check for and pull Ollama models
 echo "Checking for Ollama models..."
-MODELS=("gemma3:2b" "qwen2.5:1.5b" "deepseek-r1:1.5b")
+MODELS=("gemma3:1b" "qwen2.5:1.5b" "deepseek-r1:7b")
 for model in "${MODELS[@]}"; do
     echo "Checking for model: $model"
     if ! curl -s "http://ollama:11434/api/show" -d "{\"name\":\"$model\"}" | grep -q "model"; then
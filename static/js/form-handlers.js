@@ -12,6 +12,10 @@ function initializeCategories() {
       {
          value: 'online_videos',
          text: 'Video Content'
+      },
+      {
+         value: 'all_sources',
+         text: 'News & Videos'
       }
    ];
 
@@ -35,6 +39,10 @@ function loadFormForCategory(category) {
       loadNewsForm();
    } else if (category === 'online_videos') {
       loadVideosForm();
+   } else if (category === 'all_sources') {
+      // Both forms share the news form's country selection
+      loadNewsForm();
+      loadVideosForm(false);
    }
 }
 
@@ -119,7 +127,7 @@ function loadNewsForm() {
 }
 
 // Update loadVideosForm function to add country-source mapping
-function loadVideosForm() {
+function loadVideosForm(includeCountry = true) {
    const container = document.getElementById('customElementsContainer');
 
    // Video Platform Selection
@@ -135,9 +143,10 @@ function loadVideosForm() {
         `;
    container.appendChild(platformCol);
 
-   const videoCountryCol = document.createElement('div');
-   videoCountryCol.className = 'col-md-6';
-   videoCountryCol.innerHTML = `
+   if (includeCountry) {
+      const videoCountryCol = document.createElement('div');
+      videoCountryCol.className = 'col-md-6';
+      videoCountryCol.innerHTML = `
             <label for="country" class="form-label fw-semibold">
                 <i class="fas fa-globe me-2"></i>Country
             </label>
@@ -146,7 +155,8 @@ function loadVideosForm() {
                 <option value="gb">United Kingdom</option>
             </select>
         `;
-   container.appendChild(videoCountryCol);
+      container.appendChild(videoCountryCol);
+   }
 
    const videoChannelCol = document.createElement('div');
    videoChannelCol.className = 'col-md-6';
@@ -16,38 +16,59 @@ document.addEventListener('DOMContentLoaded', function() {
       });
   }
   
-  // Fetch feedback data from API
-  fetch('/api/model_feedback_stats')
-      .then(response => response.json())
-      .then(data => {
-          const tableBody = document.querySelector("#feedback-table tbody");
-          
-          if (data.length === 0) {
-              document.getElementById('no-data').style.display = 'block';
-              document.getElementById('feedback-table').style.display = 'none';
-              return;
-          }
+  const tableBody = document.querySelector("#feedback-table tbody");
+  const loadMoreButton = document.getElementById('load-more');
+  let nextBeforeId = null;
 
-          data.forEach(row => {
-              const tr = document.createElement("tr");
-              tr.innerHTML = `
-                  <td>${row.item_title}</td>
-                  <td>${row.predicted_sentiment}</td>
-                  <td>${row.model_used}</td>
-                  <td>${row.feedback_type}</td>
-                  <td>${row.feedback_text}</td>
-                  <td>${row.timestamp}</td>
-                  <td>${row.user_email}</td>
-              `;
-              tableBody.appendChild(tr);
+  // Fetch one page of feedback data from the API, newest first
+  function loadPage() {
+      const params = new URLSearchParams(window.location.search);
+      if (nextBeforeId !== null) {
+          params.set('before_id', nextBeforeId);
+      }
+
+      loadMoreButton.disabled = true;
+      fetch(`/api/model_feedback_stats?${params.toString()}`)
+          .then(response => response.json())
+          .then(data => {
+              if (data.results.length === 0 && tableBody.children.length === 0) {
+                  document.getElementById('no-data').style.display = 'block';
+                  document.getElementById('feedback-table').style.display = 'none';
+                  loadMoreButton.style.display = 'none';
+                  return;
+              }
+
+              data.results.forEach(row => {
+                  const tr = document.createElement("tr");
+                  tr.innerHTML = `
+                      <td>${row.item_title}</td>
+                      <td>${row.predicted_sentiment}</td>
+                      <td>${row.model_used}</td>
+                      <td>${row.feedback_type}</td>
+                      <td>${row.feedback_text}</td>
+                      <td>${row.timestamp}</td>
+                      <td>${row.user_email}</td>
+                  `;
+                  tableBody.appendChild(tr);
+              });
+
+              // Add data attributes for responsive mobile view
+              addDataAttributesToTable();
+
+              nextBeforeId = data.next_before_id;
+              loadMoreButton.style.display = nextBeforeId === null ? 'none' : 'inline-block';
+              loadMoreButton.disabled = false;
+          })
+          .catch(error => {
+              console.error("Error fetching feedback data:", error);
+              if (tableBody.children.length === 0) {
+                  document.getElementById('no-data').style.display = 'block';
+                  document.getElementById('feedback-table').style.display = 'none';
+              }
+              loadMoreButton.disabled = false;
           });
-          
-          // Add data attributes for responsive mobile view
-          addDataAttributesToTable();
-      })
-      .catch(error => {
-          console.error("Error fetching feedback data:", error);
-          document.getElementById('no-data').style.display = 'block';
-          document.getElementById('feedback-table').style.display = 'none';
-      });
+  }
+
+  loadMoreButton.addEventListener('click', loadPage);
+  loadPage();
 });
\ No newline at end of file
@@ -1,4 +1,5 @@
 let currentEventSource = null;
+let currentSearchId = null;
 let searchInProgress = false;
 let progressInterval = null;
 let analyzeButtonSelector = ".search-btn";
@@ -16,6 +17,8 @@ function handleSearchFormSubmit() {
     $("#results").show();
     
     const formData = getFormData();
+    currentSearchId = generateSearchId();
+    formData.search_id = currentSearchId;
     initializeSearchUI();
     
     // Track progress
@@ -41,6 +44,14 @@ function handleSearchFormSubmit() {
     };
 }
 
+// Identifies this search stream so the server can cancel the work behind it
+function generateSearchId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+}
+
 function getFormData() {
     const currentCategory = $("#categorySelect").val();
     let formData = {
@@ -50,11 +61,12 @@ function getFormData() {
         model: $("#modelSelect").val()
     };
     
-    if (currentCategory === 'online_news') {
+    if (currentCategory === 'online_news' || currentCategory === 'all_sources') {
         formData.source = $("#sourceSelect").val();
         formData.num_articles = $("#num_articles").val();
         formData.sort_by = $("#sort_by").val();
-    } else if (currentCategory === 'online_videos') {
+    }
+    if (currentCategory === 'online_videos' || currentCategory === 'all_sources') {
         formData.platform = $("#platformSelect").val();
         formData.channel = $("#channel").val();
         formData.num_videos = $("#num_videos").val();
@@ -98,6 +110,12 @@ function handleSearchResultMessage(event, itemsLoaded) {
     try {
         const item = JSON.parse(event.data);
         
+        if (item.error && item.source_type) {
+            // One source of a combined search failed; results from the other keep coming
+            $("#resultsList").append(createErrorMessage(item.error));
+            return;
+        }
+
         if (item.error) {
             $("#resultsList").append(createErrorMessage(item.error));
             $(".progress-bar")
@@ -141,8 +159,14 @@ function cancelCurrentSearch() {
     searchInProgress = false;
     $(analyzeButtonSelector).prop('disabled', false);
     
-    fetch('/cancel-search', { method: 'POST' })
-        .catch(err => console.error("Failed to notify backend about cancellation:", err));
+    if (currentSearchId) {
+        fetch('/cancel-search', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ search_id: currentSearchId })
+        }).catch(err => console.error("Failed to notify backend about cancellation:", err));
+        currentSearchId = null;
+    }
 }
 
 function completeSearch(itemsCount) {
@@ -152,6 +176,7 @@ function completeSearch(itemsCount) {
         currentEventSource.close();
         currentEventSource = null;
     }
+    currentSearchId = null;
     
     if (progressInterval) {
         clearInterval(progressInterval);
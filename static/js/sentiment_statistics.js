@@ -6,8 +6,8 @@ async function loadStats() {
         document.getElementById('no-data').style.display = 'none';
         document.getElementById('sentiment-stats').style.display = 'none';
         
-        // First, load the main stats data
-        const res = await fetch('/api/sentiment_statistics');
+        // Load sentiment counts grouped by query, source, model and sentiment
+        const res = await fetch('/api/sentiment_statistics/aggregate');
         if (!res.ok) {
             throw new Error(`Failed to load stats: ${res.status} ${res.statusText}`);
         }
@@ -89,7 +89,8 @@ function normalizeData(data) {
             Source: row.Source || row.source || '',
             Model: row.Model || row.model || '',
             Sentiment: row.Sentiment || row.sentiment || '',
-            // Add other fields as needed
+            // Aggregated rows carry a count; raw rows count once
+            Count: row.count || 1,
         };
     });
 }
@@ -287,7 +288,7 @@ function updateStats(data) {
                 row.Source === selectedSource && row.Query === selectedQuery && row.Model === selectedModel
             );
             
-            console.log(`Filtered data for ${selectedSource}, ${selectedQuery}, ${selectedModel}:`, filteredData.length);
+            console.log(`Filtered groups for ${selectedSource}, ${selectedQuery}, ${selectedModel}:`, filteredData.length);
             
             if (filteredData.length === 0) {
                 document.getElementById('loading').style.display = 'none';
@@ -360,10 +361,10 @@ function updateStatsSummary(selectedQuery, selectedSource, selectedModel, data)
             groupedStats[key] = { positive: 0, negative: 0, neutral: 0, total: 0 };
         }
         
-        if (sentiment === 'positive') groupedStats[key].positive++;
-        else if (sentiment === 'negative') groupedStats[key].negative++;
-        else if (sentiment === 'neutral') groupedStats[key].neutral++;
-        groupedStats[key].total++;
+        if (sentiment === 'positive') groupedStats[key].positive += row.Count;
+        else if (sentiment === 'negative') groupedStats[key].negative += row.Count;
+        else if (sentiment === 'neutral') groupedStats[key].neutral += row.Count;
+        groupedStats[key].total += row.Count;
     });
 
     const statsKey = `${selectedQuery}_${selectedSource}_${selectedModel}`;
@@ -404,8 +405,8 @@ function update3DVisualization(data) {
 
     const groupedStats = data.reduce((acc, row) => {
         const sentiment = (row.Sentiment || 'unknown').toLowerCase();
-        acc[sentiment] = (acc[sentiment] || 0) + 1;
-        acc.total = (acc.total || 0) + 1;
+        acc[sentiment] = (acc[sentiment] || 0) + row.Count;
+        acc.total = (acc.total || 0) + row.Count;
         return acc;
     }, {});
     
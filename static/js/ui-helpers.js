@@ -59,7 +59,8 @@ function showLLMLoadingScreen(show) {
 
 function displaySearchResultItem(item) {
     const currentCategory = $("#categorySelect").val();
-    const isVideo = currentCategory === 'online_videos';
+    // Combined searches tag each result with the source it came from
+    const isVideo = item.source_type ? item.source_type === 'video' : currentCategory === 'online_videos';
     
     let sentimentClass = 'sentiment-neutral';
     let sentimentIcon = 'fas fa-minus';
@@ -0,0 +1,66 @@
+import json
+import re
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+
+from result_writer import ResultWriter
+from sentiment_analyzer import VALID_SENTIMENTS, BaseSentimentAnalyzer, SentimentResult
+
+LABELS = sorted(VALID_SENTIMENTS)
+SEARCHES = 8
+SHARED_TITLES = [f"Shared headline {i}" for i in range(12)]
+OWN_TITLES = 12
+
+
+def _label(title: str) -> str:
+    return LABELS[zlib.crc32(title.encode()) % len(LABELS)]
+
+
+def _fake_post_ollama(payload, cancel_token=None, stop_when=None):
+    """Answer like Ollama: a JSON label list for batch prompts, a bare label otherwise."""
+    time.sleep(0.01)
+    prompt = payload["messages"][-1]["content"]
+    titles = re.findall(r"^\d+\. (.*)$", prompt, re.MULTILINE)
+    if payload.get("format") == "json":
+        return 200, json.dumps({"sentiments": [_label(title) for title in titles]})
+    return 200, _label(prompt)
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'results.db'}")
+    analyzer = BaseSentimentAnalyzer(engine=engine)
+    analyzer.cache.clear()
+    analyzer.persistent_cache = None
+    analyzer.writer = ResultWriter(engine, SentimentResult.__table__, ["title", "source", "model"], flush_interval=0.05)
+    monkeypatch.setattr(analyzer, "_post_ollama", _fake_post_ollama)
+    yield analyzer
+    analyzer.writer.close()
+
+
+def test_parallel_searches_share_one_analyzer(analyzer):
+    def search(search_id: int):
+        titles = SHARED_TITLES + [f"Search {search_id} headline {i}" for i in range(OWN_TITLES)]
+        labels = {}
+        for index, sentiment in analyzer._classify_titles(titles, "test-model"):
+            labels[titles[index]] = sentiment
+            analyzer._save_to_database("query", "test", titles[index], sentiment, "test", "test-model")
+        return titles, labels
+
+    with ThreadPoolExecutor(max_workers=SEARCHES) as executor:
+        searches = list(executor.map(search, range(SEARCHES)))
+
+    for titles, labels in searches:
+        assert sorted(labels) == sorted(titles)
+        assert labels == {title: _label(title) for title in titles}
+
+    analyzer.writer.close()
+    stats = analyzer.writer.stats()
+    assert stats["failed"] == 0
+    assert stats["dropped"] == 0
+    assert stats["written"] == len(SHARED_TITLES) + SEARCHES * OWN_TITLES
+    assert stats["duplicates"] == (SEARCHES - 1) * len(SHARED_TITLES)